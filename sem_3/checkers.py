@@ -1,6 +1,10 @@
+import filecmp
 import os
 import zlib
 import re
+from collections import namedtuple
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
 
 def verify_extracted_files(extract_dir, source_dir, expected_files):
@@ -70,6 +74,156 @@ def verify_crc(process_output, file_path, content=None):
     return True, ""
 
 
-def verify_file_in_listing(output, filename):
-    """Проверка наличия файла в листинге архива"""
-    return filename in output
\ No newline at end of file
+def verify_file_in_listing(listing, filename):
+    """
+    Проверка наличия файла в листинге архива по точному пути
+    :param listing: индекс index_listing или вывод 7z l -slt
+    :raises ValueError: вывод не в формате -slt (например, обычный 7z l)
+    """
+    if isinstance(listing, str):
+        if not listing.startswith('Path = ') and '\nPath = ' not in listing:
+            raise ValueError("Ожидается вывод 7z l -slt, записи Path = не найдены")
+        listing = index_listing(iter_listing(listing.splitlines()))
+    return filename in listing
+
+
+ListingEntry = namedtuple('ListingEntry', ['path', 'size', 'packed_size', 'crc', 'attributes', 'mtime', 'is_dir'])
+
+
+def _listing_int(value):
+    return int(value) if value and value.isdigit() else None
+
+
+def _listing_mtime(value):
+    if not value:
+        return None
+    # 7z выводит до семи знаков дробной части секунды, datetime понимает шесть
+    try:
+        return datetime.fromisoformat(value[:26])
+    except ValueError:
+        return None
+
+
+class SltListingParser:
+    """Потоковый разбор вывода 7z l -slt: строки подаются по одной, записи передаются обработчику"""
+
+    def __init__(self, on_entry):
+        self.on_entry = on_entry
+        self.count = 0
+        self._fields = {}
+        self._in_entries = False
+
+    def feed(self, line):
+        line = line.rstrip('\r\n')
+        if not self._in_entries:
+            # Свойства самого архива идут до разделителя из десяти дефисов
+            self._in_entries = line == '----------'
+            return
+        if not line:
+            self._flush()
+            return
+        key, sep, value = line.partition(' =')
+        if sep:
+            self._fields[key] = value[1:] if value.startswith(' ') else value
+
+    def finish(self):
+        self._flush()
+
+    def _flush(self):
+        fields, self._fields = self._fields, {}
+        if 'Path' not in fields:
+            return
+        attributes = fields.get('Attributes', '')
+        self.count += 1
+        self.on_entry(ListingEntry(
+            path=fields['Path'],
+            size=_listing_int(fields.get('Size')),
+            packed_size=_listing_int(fields.get('Packed Size')),
+            crc=fields.get('CRC') or None,
+            attributes=attributes,
+            mtime=_listing_mtime(fields.get('Modified')),
+            is_dir=fields.get('Folder') == '+' or attributes.startswith('D')
+        ))
+
+
+def iter_listing(lines):
+    """Записи листинга 7z l -slt по одной; lines - любой итератор строк, например stdout процесса"""
+    pending = []
+    parser = SltListingParser(pending.append)
+    for line in lines:
+        parser.feed(line)
+        if pending:
+            yield from pending
+            pending.clear()
+    parser.finish()
+    yield from pending
+
+
+def index_listing(entries):
+    """Индекс записей листинга по пути"""
+    return {entry.path: entry for entry in entries}
+
+
+def check_listing(entries, expected, allow_extra=False, max_report=20):
+    """
+    Сверка листинга с ожидаемыми путями за один проход
+    :param entries: записи листинга (итератор; в памяти держится только множество ожидаемых путей)
+    :param expected: пути файлов, которые должны быть в архиве; каталоги лишними не считаются
+    :return: кортеж (статус, сообщение)
+    """
+    missing = set(expected)
+    unexpected = []
+    unexpected_count = 0
+    for entry in entries:
+        if entry.path in missing:
+            missing.discard(entry.path)
+        elif not allow_extra and not entry.is_dir:
+            unexpected_count += 1
+            if len(unexpected) < max_report:
+                unexpected.append(entry.path)
+
+    errors = [f"Файл {path} не найден в архиве" for path in sorted(missing)[:max_report]]
+    if len(missing) > max_report:
+        errors.append(f"... всего отсутствует: {len(missing)}")
+    errors += [f"Лишний файл в архиве: {path}" for path in unexpected]
+    if unexpected_count > len(unexpected):
+        errors.append(f"... всего лишних: {unexpected_count}")
+    return len(errors) == 0, "\n".join(errors)
+
+def _compare_chunk(job):
+    source_root, extract_root, paths = job
+    return [path for path in paths
+            if not os.path.isfile(os.path.join(extract_root, path))
+            or not filecmp.cmp(os.path.join(source_root, path), os.path.join(extract_root, path), shallow=False)]
+
+
+def _relative_files(root):
+    for directory, _, names in os.walk(root):
+        relative = os.path.relpath(directory, root)
+        for name in names:
+            yield os.path.normpath(os.path.join(relative, name))
+
+
+def verify_tree(source_root, extract_root, workers=None, chunk=5000):
+    """
+    Побайтное сравнение большого дерева файлов с извлеченной копией
+    :param workers: число процессов сравнения, по умолчанию по числу CPU
+    :return: кортеж (статус, сообщение)
+    """
+    paths = list(_relative_files(source_root))
+    jobs = [(source_root, extract_root, paths[i:i + chunk]) for i in range(0, len(paths), chunk)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            mismatched = [path for result in pool.map(_compare_chunk, jobs) for path in result]
+    else:
+        mismatched = [path for job in jobs for path in _compare_chunk(job)]
+
+    # Лишние файлы считаются по количеству, без построения второго списка путей
+    extracted = sum(len(names) for _, _, names in os.walk(extract_root))
+    errors = [f"Файл {path} отсутствует или отличается" for path in mismatched[:20]]
+    if len(mismatched) > 20:
+        errors.append(f"... всего расхождений: {len(mismatched)}")
+    if extracted != len(paths):
+        errors.append(f"Извлечено файлов: {extracted}, ожидалось: {len(paths)}")
+    return len(errors) == 0, "\n".join(errors)
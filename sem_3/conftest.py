@@ -4,8 +4,10 @@ import shutil
 import pytest
 import yaml
 import binascii
+import hashlib
 from datetime import datetime
 from pathlib import Path
+from corpus import CorpusCache, generate_corpus
 
 
 # Загрузка конфигурации
@@ -27,6 +29,7 @@ TEST_DIR = DATA_DIR / PATHS.get('test_dir', 'test_dir')
 ARCHIVE_FILE = DATA_DIR / (PATHS.get('archive_file', 'test_archive') + '.' + ARCHIVE_CONFIG.get('type', '7z'))
 EXTRACT_DIR = DATA_DIR / PATHS.get('extract_dir', 'extracted')
 PERF_ARCHIVE_DIR = DATA_DIR / PATHS.get('perf_archive_dir', 'perf_archives')
+CORPUS_CACHE_DIR = DATA_DIR / PATHS.get('corpus_cache_dir', 'corpus_cache')
 
 # Создание директорий
 for directory in [DATA_DIR, TEST_DIR, EXTRACT_DIR, PERF_ARCHIVE_DIR]:
@@ -88,8 +91,30 @@ def log_statistics():
         stat_file.write(stat_line)
 
 
+@pytest.fixture(scope="session")
+def corpus_cache():
+    """Кеш сгенерированных файлов и эталонных архивов между сессиями (None, если выключен)"""
+    cache_config = config.get('performance', {}).get('corpus', {}).get('cache', {})
+    if not cache_config.get('enabled', True):
+        return None
+    return CorpusCache(str(CORPUS_CACHE_DIR), int(cache_config.get('max_gb', 20) * 1024 ** 3))
+
+
+def tree_manifest(root):
+    """Отсортированный список (относительный путь, SHA-256) файлов дерева"""
+    manifest = []
+    for path in sorted(Path(root).rglob('*')):
+        if path.is_file():
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            manifest.append((path.relative_to(root).as_posix(), digest.hexdigest()))
+    return manifest
+
+
 @pytest.fixture(scope="module")
-def test_environment():
+def test_environment(corpus_cache):
     """Фикстура для тестового окружения"""
     # Очистка перед запуском
     shutil.rmtree(TEST_DIR, ignore_errors=True)
@@ -100,12 +125,21 @@ def test_environment():
     # Создаем тестовые файлы
     create_test_files()
 
-    # Создаем архив
+    # Создаем архив; эталонный архив для того же дерева берется из кеша.
+    # Ключ строится по фактическому содержимому каталога и его имени, с которого начинаются пути в архиве
     archive_type = ARCHIVE_CONFIG.get('type', '7z')
-    subprocess.run(
-        ['7z', 'a', f'-t{archive_type}', str(ARCHIVE_FILE), str(TEST_DIR)],
-        check=True
-    )
+    archive_key = CorpusCache.digest('archive', archive_type, TEST_DIR.name, tree_manifest(TEST_DIR))
+    cached = corpus_cache and corpus_cache.lookup(archive_key, f'.{archive_type}')
+    if cached:
+        # Копия, а не ссылка: тесты не должны менять запись в кеше
+        CorpusCache.materialize(cached, str(ARCHIVE_FILE), copy=True)
+    else:
+        subprocess.run(
+            ['7z', 'a', f'-t{archive_type}', str(ARCHIVE_FILE), str(TEST_DIR)],
+            check=True
+        )
+        if corpus_cache:
+            corpus_cache.add(str(ARCHIVE_FILE), archive_key, f'.{archive_type}')
 
     yield {
         'test_dir': TEST_DIR,
@@ -122,34 +156,28 @@ def test_environment():
 
 # Фикстура для создания файлов разных размеров
 @pytest.fixture(scope="function")
-def make_files():
+def make_files(corpus_cache):
     """Фикстура для создания тестовых файлов разных размеров"""
     created_files = []
 
-    def _make_files(sizes_mb, prefix="perf_file"):
+    def _make_files(sizes_mb, prefix="perf_file", profile="random"):
         nonlocal created_files
-        files = []
-        block_size = config.get('performance', {}).get('block_size', '1M')
+        corpus_config = config.get('performance', {}).get('corpus', {})
+        specs = []
 
         for i, size in enumerate(sizes_mb):
             file_name = f"{prefix}_{i + 1}_{size}MB.dat"
-            file_path = TEST_DIR / file_name
-
-            # Создаем файл заданного размера
-            subprocess.run(
-                [
-                    'dd',
-                    'if=/dev/urandom',
-                    f'of={file_path}',
-                    f'bs={block_size}',
-                    f'count={size}'
-                ],
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
-            files.append(file_path)
-            created_files.append(file_path)
+            # Ключ файла определяет его содержимое при заданном зерне
+            specs.append((f"{prefix}_{i + 1}", size * 1024 * 1024, TEST_DIR / file_name))
+
+        report = generate_corpus(specs, corpus_config.get('seed', 1337), corpus_config.get('workers'), profile,
+                                 corpus_cache)
+        print(f"\nСгенерировано {report['files'] - report['cached']} файлов ({profile}), "
+              f"{report['bytes'] / 1024 / 1024:.1f} MB за {report['seconds']:.2f} сек ({report['mbps']:.1f} MB/s), "
+              f"из кеша {report['cached']}")
+
+        files = [path for _, _, path in specs]
+        created_files.extend(files)
         return files
 
     yield _make_files
@@ -157,4 +185,11 @@ def make_files():
     # Очистка созданных файлов
     for file_path in created_files:
         if file_path.exists():
-            file_path.unlink()
\ No newline at end of file
+            file_path.unlink()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Регрессия производительности проваливает сессию, если это задано в конфиге"""
+    regressions = getattr(session, 'perf_regressions', None)
+    if regressions and config.get('performance', {}).get('baseline', {}).get('fail_session', True):
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
@@ -0,0 +1,100 @@
+import threading
+import time
+
+
+def read_proc_stat(path='/proc/stat'):
+    """
+    Чтение счетчиков CPU из /proc/stat
+    :return: словарь {'cpu': (busy, total), 'cpu0': (busy, total), ...}
+    """
+    counters = {}
+    with open(path) as f:
+        for line in f:
+            if not line.startswith('cpu'):
+                break
+            name, *values = line.split()
+            values = [int(v) for v in values]
+            # idle и iowait считаются простоем
+            idle = values[3] + (values[4] if len(values) > 4 else 0)
+            total = sum(values[:8])
+            counters[name] = (total - idle, total)
+    return counters
+
+
+def _core_names(counters):
+    """Имена ядер в порядке номеров: cpu2 перед cpu10"""
+    return sorted((name for name in counters if name != 'cpu'), key=lambda name: int(name[3:]))
+
+
+def _utilisation(before, after):
+    busy = after[0] - before[0]
+    total = after[1] - before[1]
+    return 100.0 * busy / total if total > 0 else 0.0
+
+
+class CpuSampler:
+    """Замер загрузки CPU по /proc/stat на время выполнения операции"""
+
+    def __init__(self, interval=0.05, path='/proc/stat'):
+        self.interval = interval
+        self.path = path
+        self.series = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._first = None
+        self._last = None
+        self._start = None
+
+    def _sample(self):
+        counters = read_proc_stat(self.path)
+        total = _utilisation(self._last['cpu'], counters['cpu'])
+        cores = [_utilisation(self._last[name], counters[name])
+                 for name in _core_names(counters) if name in self._last]
+        self.series.append((time.perf_counter() - self._start, total, cores))
+        self._last = counters
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._first = self._last = read_proc_stat(self.path)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        # Последний интервал захватывает хвост операции короче периода опроса
+        self._sample()
+        return self.summary()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def summary(self):
+        """
+        Итоги замера
+        :return: словарь: mean и peak по всем ядрам, per_core_mean, per_core_peak, series
+        """
+        totals = [total for _, total, _ in self.series]
+        core_names = _core_names(self._first)
+        per_core_mean = [round(_utilisation(self._first[name], self._last[name]), 1)
+                         for name in core_names]
+        per_core_peak = [round(max(cores[i] for _, _, cores in self.series), 1)
+                         for i in range(len(core_names))] if self.series else []
+        return {
+            'interval': self.interval,
+            'samples': len(self.series),
+            'mean': round(_utilisation(self._first['cpu'], self._last['cpu']), 1),
+            'peak': round(max(totals), 1) if totals else 0.0,
+            'per_core_mean': per_core_mean,
+            'per_core_peak': per_core_peak,
+            'series': [(round(t, 3), round(total, 1), [round(c, 1) for c in cores])
+                       for t, total, cores in self.series]
+        }
@@ -0,0 +1,169 @@
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+
+def _walk_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in names:
+                    yield os.path.join(root, name)
+        elif os.path.exists(path):
+            yield path
+
+
+def evict_page_cache(paths):
+    """Выгружает файлы (каталоги - рекурсивно) из кеша страниц, чтобы следующее чтение шло с диска"""
+    for path in _walk_files(paths):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            # Грязные страницы DONTNEED не выгружает, поэтому сначала сброс на диск
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def fsync_paths(paths):
+    """Сбрасывает на диск файлы и каталоги (каталоги - рекурсивно, вместе с записями о файлах)"""
+    for path in paths:
+        targets = list(_walk_files([path]))
+        if os.path.isdir(path):
+            targets += [root for root, _, _ in os.walk(path)]
+        for target in targets:
+            fd = os.open(target, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+def filesystem_type(path):
+    """Тип файловой системы, на которой лежит путь, по /proc/mounts"""
+    path = os.path.realpath(path)
+    best, fs_type = '', 'unknown'
+    with open('/proc/mounts') as f:
+        for line in f:
+            _, mount_point, kind = line.split()[:3]
+            if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) \
+                    and len(mount_point) > len(best):
+                best, fs_type = mount_point, kind
+    return fs_type
+
+
+# Классы ionice по имени
+IONICE_CLASSES = {'realtime': 1, 'best-effort': 2, 'idle': 3}
+
+
+def launcher_args(limits):
+    """
+    Префикс команды, накладывающий ограничения на запускаемый процесс
+    :param limits: словарь: cpus ("0-1" или список), memory_mb (prlimit --as), nice,
+                   ionice ("idle", "best-effort:4", "realtime:0")
+    :return: список аргументов; утилиты выполняют exec, поэтому rusage остается у того же процесса
+    """
+    if not limits:
+        return []
+    prefix = []
+    cpus = limits.get('cpus')
+    if cpus is not None:
+        prefix += ['taskset', '-c', cpus if isinstance(cpus, str) else ','.join(str(cpu) for cpu in cpus)]
+    if limits.get('memory_mb'):
+        prefix += ['prlimit', f"--as={int(limits['memory_mb'] * 1024 * 1024)}"]
+    if limits.get('nice') is not None:
+        prefix += ['nice', '-n', str(limits['nice'])]
+    if limits.get('ionice'):
+        name, _, level = str(limits['ionice']).partition(':')
+        prefix += ['ionice', '-c', str(IONICE_CLASSES.get(name, name))] + (['-n', level] if level else [])
+    return prefix
+
+
+def limits_label(limits):
+    """Краткая запись ограничений для отчетов, например 'cpus=0-1 mem=512MB nice=10'"""
+    parts = []
+    if limits:
+        cpus = limits.get('cpus')
+        if cpus is not None:
+            parts.append(f"cpus={cpus if isinstance(cpus, str) else ','.join(str(cpu) for cpu in cpus)}")
+        if limits.get('memory_mb'):
+            parts.append(f"mem={limits['memory_mb']}MB")
+        if limits.get('nice') is not None:
+            parts.append(f"nice={limits['nice']}")
+        if limits.get('ionice'):
+            parts.append(f"io={limits['ionice']}")
+    return ' '.join(parts) or 'none'
+
+
+def run_measured(args, check=True, sync=None, limits=None):
+    """
+    Запускает команду и снимает ее ресурсы через wait4
+    :param args: команда списком аргументов
+    :param check: выбрасывать CalledProcessError при ненулевом коде возврата
+    :param sync: пути результатов, сбрасываемые на диск внутри замеряемого интервала
+    :param limits: ограничения процесса, включая привязку к CPU, см. launcher_args
+    :return: словарь с временем, rusage и кодом возврата
+    """
+    with tempfile.TemporaryFile() as err:
+        start_time = datetime.now().isoformat()
+        start = time.perf_counter()
+        process = subprocess.Popen(launcher_args(limits) + list(args), stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL, stderr=err)
+        # wait4 забирает процесс и возвращает rusage именно этого процесса
+        _, status, usage = os.wait4(process.pid, 0)
+        if sync:
+            fsync_paths(sync)
+        duration = time.perf_counter() - start
+        end_time = datetime.now().isoformat()
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        err.seek(0)
+        stderr = err.read()[-4096:].decode('utf-8', errors='replace')
+
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args, stderr=stderr)
+
+    return {
+        'exit_code': process.returncode,
+        'start_time': start_time,
+        'end_time': end_time,
+        'duration': duration,
+        'user_s': usage.ru_utime,
+        'sys_s': usage.ru_stime,
+        'max_rss_kb': usage.ru_maxrss,
+        'voluntary_cs': usage.ru_nvcsw,
+        'involuntary_cs': usage.ru_nivcsw,
+        'block_in': usage.ru_inblock,
+        'block_out': usage.ru_oublock,
+        'stderr': stderr
+    }
+
+
+def host_fingerprint():
+    """Отпечаток окружения: модель CPU, число ядер, версия ядра и 7z"""
+    cpu_model = 'unknown'
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    cpu_model = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+
+    try:
+        banner = subprocess.run(['7z'], capture_output=True, text=True).stdout
+        version = next((line.split(':')[0].strip() for line in banner.splitlines() if '7-Zip' in line),
+                       'unknown')
+    except FileNotFoundError:
+        version = 'unknown'
+
+    return {
+        'cpu_model': cpu_model,
+        'cpu_count': os.cpu_count(),
+        'kernel': platform.release(),
+        '7z_version': version
+    }
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import statistics
+from pathlib import Path
+
+from stats import compare
+
+
+def fingerprint_id(fingerprint):
+    """Короткий идентификатор окружения по его отпечатку"""
+    data = json.dumps(fingerprint, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def baseline_key(test_case, operation, env_id):
+    return f"{test_case}|{operation}|{env_id}"
+
+
+def load_baseline(path):
+    """Загрузка базовой линии: {ключ: {'fingerprint': ..., 'samples': [...]}}"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(path, baseline):
+    Path(path).write_text(json.dumps(baseline, indent=2, ensure_ascii=False, sort_keys=True))
+
+
+def check_regressions(baseline, current, fingerprint, tolerance=0.1, alpha=0.05):
+    """
+    Сравнение пропускной способности текущего запуска с базовой линией
+    :param current: {(тест, операция): [MB/s, ...]}
+    :param tolerance: допустимое падение медианы пропускной способности (доля)
+    :return: список словарей со статусом: new, ok, improvement, suspect или regression
+    """
+    env_id = fingerprint_id(fingerprint)
+    report = []
+    for (test_case, operation), samples in sorted(current.items()):
+        key = baseline_key(test_case, operation, env_id)
+        entry = {'test_case': test_case, 'operation': operation, 'key': key,
+                 'median': statistics.median(samples)}
+
+        if key not in baseline:
+            entry['status'] = 'new'
+            report.append(entry)
+            continue
+
+        result = compare(baseline[key]['samples'], samples, alpha)
+        entry.update(result)
+        if result['change'] < -tolerance:
+            # Падение больше допуска: регрессия, если оно статистически значимо
+            entry['status'] = 'regression' if result['significant'] else 'suspect'
+        elif result['change'] > tolerance and result['significant']:
+            entry['status'] = 'improvement'
+        else:
+            entry['status'] = 'ok'
+        report.append(entry)
+    return report
+
+
+def update_baseline(baseline, current, fingerprint, replace=False):
+    """Заносит замеры в базовую линию; существующие ключи меняются только при replace"""
+    env_id = fingerprint_id(fingerprint)
+    for (test_case, operation), samples in current.items():
+        key = baseline_key(test_case, operation, env_id)
+        if replace or key not in baseline:
+            baseline[key] = {'fingerprint': fingerprint, 'samples': list(samples)}
+    return baseline
+
+
+def print_regression_report(report, tolerance):
+    print("\nСравнение с базовой линией (MB/s):")
+    print("-" * 90)
+    print(f"{'Тест':<20} | {'Операция':<10} | {'База':>8} | {'Сейчас':>8} | {'Изм.':>7} | {'p':>6} | Статус")
+    print("-" * 90)
+    for entry in report:
+        if entry['status'] == 'new':
+            print(f"{entry['test_case'][:20]:<20} | {entry['operation']:<10} | {'-':>8} | "
+                  f"{entry['median']:>8.2f} | {'-':>7} | {'-':>6} | new")
+            continue
+        print(f"{entry['test_case'][:20]:<20} | {entry['operation']:<10} | {entry['baseline_median']:>8.2f} | "
+              f"{entry['candidate_median']:>8.2f} | {entry['change']:>+7.1%} | {entry['p_value']:>6.3f} | "
+              f"{entry['status']}")
+    print(f"Допуск: {tolerance:.0%}")
+
+
+def run_gate(current, fingerprint, gate_config):
+    """
+    Проверка регрессий с выводом отчета и обновлением базовой линии
+    :return: список регрессий
+    """
+    path = gate_config.get('file', 'performance_baseline.json')
+    tolerance = gate_config.get('tolerance', 0.1)
+    baseline = load_baseline(path)
+
+    report = check_regressions(baseline, current, fingerprint, tolerance, gate_config.get('alpha', 0.05))
+    print_regression_report(report, tolerance)
+
+    # Новые ключи заносятся всегда, существующие - только по явному запросу
+    replace = gate_config.get('update', False) or os.environ.get('PERF_BASELINE_UPDATE') == '1'
+    save_baseline(path, update_baseline(baseline, current, fingerprint, replace))
+
+    return [entry for entry in report if entry['status'] == 'regression']
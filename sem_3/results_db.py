@@ -0,0 +1,215 @@
+import csv
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from regression import fingerprint_id
+from stats import Aggregator
+
+# Подписи колонок CSV для совместимости со старым форматом отчета
+COLUMN_LABELS = {
+    'test_case': "Test Case",
+    'operation': "Operation",
+    'total_size_mb': "Total Size (MB)",
+    'file_count': "File Count",
+    'start_time': "Start Time",
+    'end_time': "End Time",
+    'duration_s': "Duration (s)",
+    'speed_mbps': "Speed (MB/s)",
+    'trial': "Trial",
+}
+METRIC_LABELS = {
+    'mean_cpu': "Mean CPU (%)",
+    'max_cpu': "Max CPU (%)",
+    'user_s': "User CPU (s)",
+    'sys_s': "Sys CPU (s)",
+    'cpu_time_s': "CPU Time (s)",
+    'max_rss_mb': "Max RSS (MB)",
+    'voluntary_cs': "Voluntary CS",
+    'involuntary_cs': "Involuntary CS",
+    'block_in': "Block In",
+    'block_out': "Block Out",
+    'compression_ratio': "Compression Ratio",
+    'size_scale': "Size Scale",
+    'threads': "Threads",
+    'speedup': "Speedup",
+    'efficiency': "Efficiency",
+    'knee_threads': "Knee Threads",
+    'method': "Method",
+    'level': "Level",
+    'dictionary': "Dictionary",
+    'archive_bytes': "Archive Size (bytes)",
+    'io_mode': "IO Mode",
+    'limits': "Limits",
+    'jobs': "Jobs",
+    'aggregate_mbps': "Aggregate MB/s",
+    'slowdown': "Slowdown",
+    'entries': "Entries",
+    'depth': "Depth",
+    'fanout': "Fan-out",
+    'per_entry_us': "Per Entry (us)",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    fingerprint_id TEXT NOT NULL,
+    cpu_model TEXT,
+    cpu_count INTEGER,
+    kernel TEXT,
+    sevenzip_version TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    test_case TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    trial INTEGER NOT NULL,
+    total_size_mb REAL,
+    file_count INTEGER,
+    start_time TEXT,
+    end_time TEXT,
+    duration_s REAL NOT NULL,
+    speed_mbps REAL NOT NULL,
+    metrics TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS results_case_idx ON results (test_case, operation);
+CREATE INDEX IF NOT EXISTS results_run_idx ON results (run_id);
+CREATE INDEX IF NOT EXISTS runs_fingerprint_idx ON runs (fingerprint_id);
+"""
+
+# Метрики, по которым ведется накопительная статистика
+AGGREGATED_METRICS = ('duration_s', 'speed_mbps', 'max_cpu', 'max_rss_mb', 'compression_ratio')
+
+RESULT_COLUMNS = ('run_id', 'test_case', 'operation', 'trial', 'total_size_mb', 'file_count',
+                  'start_time', 'end_time', 'duration_s', 'speed_mbps', 'metrics')
+
+
+class ResultsStore:
+    """Хранилище результатов производительности в SQLite"""
+
+    def __init__(self, path='performance_results.db', batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        # База общая для sem_3 и sem_4 и может лежать вне каталога набора
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.run_id = None
+        self.fingerprint = None
+        self._pending = []
+        # Сводка текущего запуска обновляется при каждой записи, без чтения базы
+        self.aggregator = Aggregator(AGGREGATED_METRICS)
+
+    def start_run(self, fingerprint, suite):
+        """Регистрирует запуск с отпечатком окружения и делает его текущим"""
+        cursor = self.connection.execute(
+            "INSERT INTO runs (started, suite, fingerprint_id, cpu_model, cpu_count, kernel, sevenzip_version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (datetime.now().isoformat(), suite, fingerprint_id(fingerprint), fingerprint.get('cpu_model'),
+             fingerprint.get('cpu_count'), fingerprint.get('kernel'), fingerprint.get('7z_version'))
+        )
+        self.connection.commit()
+        self.run_id = cursor.lastrowid
+        self.fingerprint = fingerprint
+        return self.run_id
+
+    def record(self, test_case, operation, total_size, file_count, start_time, end_time,
+               duration, trial=1, **metrics):
+        """Добавляет результат в буфер; запись в базу идет пакетами"""
+        speed = total_size / duration if duration > 0 else 0
+        self._pending.append((self.run_id, test_case, operation, trial, total_size, file_count,
+                              start_time, end_time, duration, speed, json.dumps(metrics)))
+        self.aggregator.add((test_case, operation), dict(metrics, duration_s=duration, speed_mbps=speed))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO results ({', '.join(RESULT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(RESULT_COLUMNS))})",
+                self._pending
+            )
+        self._pending = []
+
+    def _metric_expression(self, metric):
+        if metric in COLUMN_LABELS:
+            return metric
+        if not metric.isidentifier():
+            raise ValueError(f"Недопустимое имя метрики: {metric}")
+        return f"json_extract(metrics, '$.{metric}')"
+
+    def samples(self, metric='speed_mbps', run_id=None):
+        """
+        Значения метрики по тестам текущего (или заданного) запуска
+        :return: {(тест, операция): [значения по прогонам]}
+        """
+        self.flush()
+        rows = self.connection.execute(
+            f"SELECT test_case, operation, {self._metric_expression(metric)} FROM results "
+            f"WHERE run_id = ? ORDER BY id",
+            (run_id or self.run_id,)
+        )
+        samples = {}
+        for test_case, operation, value in rows:
+            if value is not None:
+                samples.setdefault((test_case, operation), []).append(value)
+        return samples
+
+    def trend(self, test_case, operation, metric='speed_mbps', fingerprint=None, limit=None):
+        """
+        Динамика метрики по запускам
+        :param fingerprint: ограничить запусками на том же окружении
+        :return: список (время запуска, id окружения, число замеров, среднее, минимум, максимум)
+        """
+        self.flush()
+        expression = self._metric_expression(metric)
+        query = (
+            f"SELECT runs.started, runs.fingerprint_id, COUNT(*), AVG({expression}), "
+            f"MIN({expression}), MAX({expression}) "
+            f"FROM results JOIN runs ON runs.id = results.run_id "
+            f"WHERE results.test_case = ? AND results.operation = ?"
+        )
+        params = [test_case, operation]
+        if fingerprint is not None:
+            query += " AND runs.fingerprint_id = ?"
+            params.append(fingerprint_id(fingerprint))
+        query += " GROUP BY runs.id ORDER BY runs.started DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self.connection.execute(query, params).fetchall()
+
+    def export_csv(self, path, run_id=None):
+        """Выгрузка результатов запуска в CSV в прежнем формате колонок"""
+        self.flush()
+        run_id = run_id or self.run_id
+
+        # Первый проход собирает набор метрик, второй пишет строки; оба потоковые
+        metric_keys = []
+        for (metrics,) in self.connection.execute("SELECT metrics FROM results WHERE run_id = ?", (run_id,)):
+            for key in json.loads(metrics):
+                if key not in metric_keys:
+                    metric_keys.append(key)
+
+        rows = self.connection.execute(
+            f"SELECT {', '.join(COLUMN_LABELS)}, metrics FROM results WHERE run_id = ? ORDER BY id",
+            (run_id,)
+        )
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([COLUMN_LABELS[column] for column in COLUMN_LABELS] +
+                            [METRIC_LABELS.get(key, key) for key in metric_keys])
+            for row in rows:
+                metrics = json.loads(row[-1])
+                writer.writerow(list(row[:-1]) + [metrics.get(key, '') for key in metric_keys])
+
+    def close(self):
+        self.flush()
+        self.connection.close()
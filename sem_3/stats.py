@@ -0,0 +1,329 @@
+import math
+import statistics
+
+# Критические значения t-распределения (двусторонние) для 1..30 степеней свободы
+T_CRITICAL = {
+    0.90: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+           1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+           1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697],
+    0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+           2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+           2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042],
+    0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+           3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+           2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750],
+}
+Z_CRITICAL = {0.90: 1.645, 0.95: 1.960, 0.99: 2.576}
+
+
+def t_critical(confidence, dof):
+    """Критическое значение t для доверительного интервала"""
+    if confidence not in T_CRITICAL:
+        raise ValueError(f"Неподдерживаемый уровень доверия: {confidence}")
+    if dof <= len(T_CRITICAL[confidence]):
+        return T_CRITICAL[confidence][dof - 1]
+    return Z_CRITICAL[confidence]
+
+
+def percentile(values, q):
+    """Перцентиль q (0..100) с линейной интерполяцией"""
+    ordered = sorted(values)
+    if not ordered:
+        return float('nan')
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def reject_outliers(values, method='iqr', k=None):
+    """
+    Отбрасывание выбросов
+    :param method: 'iqr' (межквартильный размах), 'mad' (медианное отклонение) или None
+    :return: кортеж (оставленные значения, отброшенные значения)
+    """
+    if not method or len(values) < 4:
+        return list(values), []
+
+    if method == 'iqr':
+        k = 1.5 if k is None else k
+        q1, q3 = percentile(values, 25), percentile(values, 75)
+        low, high = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    elif method == 'mad':
+        k = 3.5 if k is None else k
+        median = statistics.median(values)
+        mad = statistics.median(abs(v - median) for v in values)
+        if mad == 0:
+            return list(values), []
+        # 1.4826 приводит MAD к стандартному отклонению нормального распределения
+        low, high = median - k * 1.4826 * mad, median + k * 1.4826 * mad
+    else:
+        raise ValueError(f"Неизвестный метод отбраковки: {method}")
+
+    kept = [v for v in values if low <= v <= high]
+    rejected = [v for v in values if not low <= v <= high]
+    return kept, rejected
+
+
+def summarize(values, confidence=0.95, outliers='iqr'):
+    """
+    Сводная статистика по повторным замерам
+    :return: словарь n, rejected, mean, median, p95, stdev, min, max, ci_low, ci_high
+    """
+    kept, rejected = reject_outliers(values, outliers)
+    n = len(kept)
+    mean = statistics.fmean(kept)
+    stdev = statistics.stdev(kept) if n > 1 else 0.0
+    margin = t_critical(confidence, n - 1) * stdev / math.sqrt(n) if n > 1 else 0.0
+    return {
+        'n': n,
+        'rejected': len(rejected),
+        'mean': mean,
+        'median': statistics.median(kept),
+        'p95': percentile(kept, 95),
+        'stdev': stdev,
+        'min': min(kept),
+        'max': max(kept),
+        'ci_low': mean - margin,
+        'ci_high': mean + margin
+    }
+
+
+def _normal_sf(z):
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def mann_whitney(a, b):
+    """
+    U-критерий Манна-Уитни, двусторонний, нормальное приближение с поправкой на связки
+    :return: кортеж (U для выборки a, p-value)
+    """
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return float('nan'), 1.0
+
+    combined = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks = [0.0] * len(combined)
+    tie_term = 0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return u, min(1.0, 2 * _normal_sf(max(z, 0.0)))
+
+
+def compare(baseline, candidate, alpha=0.05):
+    """
+    Сравнение двух распределений замеров
+    :return: словарь: медианы, относительное изменение медианы, p-value, значимость
+    """
+    median_a = statistics.median(baseline)
+    median_b = statistics.median(candidate)
+    _, p_value = mann_whitney(baseline, candidate)
+    return {
+        'baseline_median': median_a,
+        'candidate_median': median_b,
+        'change': (median_b - median_a) / median_a if median_a else float('nan'),
+        'p_value': p_value,
+        'significant': p_value < alpha
+    }
+
+
+def run_trials(trial, warmup=1, repeat=5):
+    """
+    Прогревочные и измеряемые прогоны одной операции
+    :param trial: функция без аргументов, выполняющая один прогон и возвращающая замер
+    :return: список замеров измеряемых прогонов
+    """
+    for _ in range(warmup):
+        trial()
+    return [trial() for _ in range(repeat)]
+
+
+def scaling_curve(durations, min_efficiency=0.7):
+    """
+    Ускорение и параллельная эффективность относительно одного потока
+    :param durations: {число потоков: [длительности прогонов]}, должен содержать 1
+    :param min_efficiency: эффективность, ниже которой добавление потоков считается неоправданным
+    :return: кортеж (список точек threads, median, speedup, efficiency; колено кривой)
+    """
+    base = statistics.median(durations[1])
+    points = []
+    knee = 1
+    for threads in sorted(durations):
+        median = statistics.median(durations[threads])
+        speedup = base / median if median > 0 else float('nan')
+        efficiency = speedup / threads
+        points.append({'threads': threads, 'median': median, 'speedup': speedup, 'efficiency': efficiency})
+        # Колено - наибольшее число потоков, еще работающих с приемлемой эффективностью
+        if efficiency >= min_efficiency:
+            knee = threads
+    return points, knee
+
+
+def contention_curve(levels):
+    """
+    Пропускная способность и задержки при N одновременных заданиях
+    :param levels: {N: {'latencies': [длительности заданий], 'mbps': [суммарная MB/s по раундам]}},
+                   должен содержать 1
+    :return: список точек jobs, aggregate_mbps, p50, p95, max, slowdown (p50 относительно одного задания)
+    """
+    base = percentile(levels[1]['latencies'], 50)
+    points = []
+    for jobs in sorted(levels):
+        latencies = levels[jobs]['latencies']
+        p50 = percentile(latencies, 50)
+        points.append({
+            'jobs': jobs,
+            'aggregate_mbps': statistics.median(levels[jobs]['mbps']),
+            'p50': p50,
+            'p95': percentile(latencies, 95),
+            'max': max(latencies),
+            'slowdown': p50 / base if base > 0 else float('nan')
+        })
+    return points
+
+
+def pareto_frontier(points, minimize, maximize):
+    """
+    Недоминируемые точки: нет другой точки не хуже по обоим критериям и лучше хотя бы по одному
+    :param minimize: ключ критерия, который уменьшается (например, степень сжатия)
+    :param maximize: ключ критерия, который растет (например, скорость)
+    :return: точки фронта по возрастанию minimize
+    """
+    frontier = []
+    best = float('-inf')
+    for point in sorted(points, key=lambda p: (p[minimize], -p[maximize])):
+        if point[maximize] > best:
+            frontier.append(point)
+            best = point[maximize]
+    return frontier
+
+
+class P2Quantile:
+    """Потоковая оценка квантиля алгоритмом P² (Jain, Chlamtac) за O(1) памяти"""
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Корректировка трех средних маркеров
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self):
+        if not self.heights:
+            return float('nan')
+        if self.positions[4] <= 4:
+            return percentile(self.heights, self.p * 100)
+        return self.heights[2]
+
+
+class RunningStats:
+    """Накопительная статистика одной метрики: Welford для дисперсии, P² для перцентилей"""
+
+    def __init__(self, quantiles=(50, 95)):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.quantiles = {q: P2Quantile(q / 100) for q in quantiles}
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        for sketch in self.quantiles.values():
+            sketch.add(x)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def summary(self):
+        result = {
+            'count': self.count,
+            'mean': self.mean,
+            'stdev': math.sqrt(self.variance),
+            'min': self.min,
+            'max': self.max
+        }
+        for q, sketch in self.quantiles.items():
+            result[f'p{q}'] = sketch.value()
+        return result
+
+
+class Aggregator:
+    """Накопительная статистика по ключам (тест, операция) для набора метрик"""
+
+    def __init__(self, metrics, quantiles=(50, 95)):
+        self.metrics = metrics
+        self.quantiles = quantiles
+        self.groups = {}
+
+    def add(self, key, values):
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {metric: RunningStats(self.quantiles) for metric in self.metrics}
+        for metric, stats in group.items():
+            value = values.get(metric)
+            if value is not None:
+                stats.add(value)
+
+    def table(self):
+        """Итоговая таблица: {(тест, операция): {метрика: сводка}}"""
+        return {key: {metric: stats.summary() for metric, stats in group.items()}
+                for key, group in self.groups.items()}
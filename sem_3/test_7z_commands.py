@@ -6,10 +6,19 @@ import tempfile
 import binascii
 import re
 import time
-import csv
+from concurrent.futures import ThreadPoolExecutor
+import json
+import statistics
 from datetime import datetime
 from pathlib import Path
-from checkers import verify_extracted_files, verify_crc, verify_file_in_listing
+from checkers import (verify_extracted_files, verify_crc, verify_file_in_listing, verify_tree,
+                      iter_listing, index_listing, check_listing)
+from corpus import generate_tree
+from cpu_sampler import CpuSampler
+from measure import run_measured, host_fingerprint, evict_page_cache, filesystem_type, limits_label
+from regression import run_gate
+from results_db import ResultsStore
+from stats import run_trials, summarize, compare, scaling_curve, pareto_frontier, contention_curve
 from conftest import config, DATA_DIR, TEST_DIR, ARCHIVE_FILE, EXTRACT_DIR, PERF_ARCHIVE_DIR
 
 
@@ -31,32 +40,19 @@ def get_expected_files():
     return expected
 
 
-# Путь к CSV-файлу с результатами
+# База результатов и CSV-выгрузка текущего запуска для совместимости
+PERF_DB = config.get('performance', {}).get('results_db', '../data/performance_results.db')
 PERF_RESULTS = Path("performance_results.csv")
 
 
-# Фикстура для инициализации CSV-файла
 @pytest.fixture(scope="session", autouse=True)
-def init_csv_report():
-    """Инициализация CSV-файла для результатов"""
-    if PERF_RESULTS.exists():
-        # Создаем резервную копию старого отчета
-        backup_name = f"performance_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        PERF_RESULTS.rename(backup_name)
-
-    # Создаем заголовки CSV
-    with open(PERF_RESULTS, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "Test Case",
-            "Operation",
-            "Total Size (MB)",
-            "File Count",
-            "Start Time",
-            "End Time",
-            "Duration (s)",
-            "Speed (MB/s)"
-        ])
+def results_store():
+    """Хранилище результатов: один запуск на сессию с отпечатком окружения"""
+    store = ResultsStore(PERF_DB)
+    store.start_run(host_fingerprint(), suite='sem_3')
+    yield store
+    store.export_csv(PERF_RESULTS)
+    store.close()
 
 
 # -------------------- Базовые тесты функциональности --------------------
@@ -65,17 +61,48 @@ def test_archive_listing(test_environment):
     """Тест команды вывода списка файлов в архиве (l)"""
     archive_type = config.get('archive', {}).get('type', '7z')
 
-    result = subprocess.run(
-        ['7z', 'l', f'-t{archive_type}', str(ARCHIVE_FILE)],
-        capture_output=True,
-        text=True,
-        check=True
-    )
+    # Машиночитаемый листинг разбирается по мере чтения вывода
+    with subprocess.Popen(
+        ['7z', 'l', '-slt', f'-t{archive_type}', str(ARCHIVE_FILE)],
+        stdout=subprocess.PIPE,
+        text=True
+    ) as process:
+        listing = index_listing(iter_listing(process.stdout))
+    assert process.returncode == 0, "7z l завершилась с ошибкой"
+
+    # Архив содержит каталог TEST_DIR целиком, пути в нем начинаются с его имени
+    expected = [f"{TEST_DIR.name}/{file_info['path']}" for file_info in config['test_files']]
+    for path in expected:
+        assert verify_file_in_listing(listing, path), f"Файл {path} не найден в архиве"
+
+    status, message = check_listing(listing.values(), expected)
+    assert status, message
 
-    for file_info in config['test_files']:
-        assert verify_file_in_listing(result.stdout, file_info['path']), \
-            f"Файл {file_info['path']} не найден в архиве"
 
+# Фрагмент вывода 7z l -slt: заголовок архива и две записи
+SLT_SAMPLE = """Path = archive.7z
+Type = 7z
+
+----------
+Path = file1.txt.bak
+Size = 10
+Attributes = A
+
+Path = subdir/file1.txt.bak
+Size = 12
+Attributes = A
+"""
+
+
+def test_listing_exact_path():
+    """Проверка листинга по точному пути: file1.txt не совпадает с file1.txt.bak"""
+    assert verify_file_in_listing(SLT_SAMPLE, "subdir/file1.txt.bak")
+    assert not verify_file_in_listing(SLT_SAMPLE, "file1.txt")
+    assert not verify_file_in_listing(SLT_SAMPLE, "subdir/file1.txt")
+
+    # Обычный вывод 7z l не разбирается молча, а отвергается
+    with pytest.raises(ValueError):
+        verify_file_in_listing("2024-05-01 10:11:12 ....A  10  10  subdir/file1.txt.bak", "file1.txt")
 
 def test_archive_extraction(test_environment):
     """Тест команды извлечения файлов (x)"""
@@ -161,68 +188,139 @@ def test_temp_file_hash():
 
 # -------------------- Тесты производительности --------------------
 
-def run_performance_test(test_name, files, total_size, file_count):
-    """Выполняет тест производительности и записывает результаты в CSV"""
+# Период опроса /proc/stat во время операций
+CPU_SAMPLE_INTERVAL = config.get('performance', {}).get('cpu_sampling', {}).get('interval_ms', 50) / 1000
+CPU_LOG_DIR = Path("cpu_logs")
+
+
+def save_cpu_log(test_name, operation, summary):
+    """Сохраняет ряд загрузки CPU в cpu_logs и возвращает итоги замера"""
+    CPU_LOG_DIR.mkdir(exist_ok=True)
+    log_file = CPU_LOG_DIR / f"{test_name.replace(' ', '_')}_{operation}.json"
+    log_file.write_text(json.dumps(summary))
+    return summary
+
+
+def write_result_row(store, test_name, operation, total_size, file_count, measurement, cpu, trial=1, **metrics):
+    """Записывает результат одной операции в хранилище"""
+    store.record(
+        test_name, operation, total_size, file_count,
+        measurement['start_time'], measurement['end_time'], measurement['duration'], trial,
+        mean_cpu=cpu['mean'],
+        max_cpu=cpu['peak'],
+        user_s=round(measurement['user_s'], 3),
+        sys_s=round(measurement['sys_s'], 3),
+        max_rss_mb=round(measurement['max_rss_kb'] / 1024, 1),
+        voluntary_cs=measurement['voluntary_cs'],
+        involuntary_cs=measurement['involuntary_cs'],
+        block_in=measurement['block_in'],
+        block_out=measurement['block_out'],
+        **metrics
+    )
+
+
+def measure_operation(test_name, operation, args, sync=None, limits=None):
+    """Выполняет операцию 7z под замером ресурсов и загрузки CPU"""
+    with CpuSampler(CPU_SAMPLE_INTERVAL) as sampler:
+        measurement = run_measured(args, sync=sync, limits=limits)
+    cpu = save_cpu_log(test_name, operation, sampler.summary())
+    return measurement, cpu
+
+
+# Параметры повторных прогонов
+TRIALS = config.get('performance', {}).get('trials', {})
+
+# Режим ввода-вывода: кеш страниц, fsync результатов, файловая система результатов
+IO = config.get('performance', {}).get('io', {})
+
+
+def io_mode():
+    """Метка режима ввода-вывода, например 'cold+fsync/tmpfs'"""
+    return (IO.get('cache', 'warm') + ('+fsync' if IO.get('fsync', False) else '') +
+            '/' + IO.get('target', 'disk'))
+
+
+def output_dirs():
+    """Каталоги архива и распаковки для выбранной файловой системы"""
+    if IO.get('target', 'disk') == 'tmpfs':
+        tmpfs_dir = Path(IO.get('tmpfs_dir', '/dev/shm/7z_bench'))
+        if filesystem_type(tmpfs_dir.parent) != 'tmpfs':
+            pytest.skip(f"{tmpfs_dir.parent} не на tmpfs")
+        return tmpfs_dir / "archives", tmpfs_dir / "extracted"
+    return PERF_ARCHIVE_DIR, EXTRACT_DIR
+
+
+def operation_label(operation):
+    """Имя операции в результатах: не в режиме по умолчанию к нему добавляется режим ввода-вывода"""
+    mode = io_mode()
+    return operation if mode == "warm/disk" else f"{operation} ({mode})"
+
+
+# Ограничения процесса 7z по умолчанию; тест-кейс переопределяет их ключом limits
+LIMITS = config.get('performance', {}).get('limits', {})
+
+
+def case_limits(test_case):
+    limits = {key: value for key, value in dict(LIMITS, **test_case.get('limits', {})).items() if value is not None}
+    return limits or None
+
+
+def run_performance_test(test_name, files, total_size, file_count, store, limits=None, **metrics):
+    """Выполняет тест производительности с повторными прогонами и записывает результаты"""
     archive_type = config['archive'].get('type', '7z')
     archive_file = f"perf_archive_{test_name.replace(' ', '_')}.{archive_type}"
-    archive_path = PERF_ARCHIVE_DIR / archive_file
-
-    # Тест архивирования
-    archive_start = time.time()
-    archive_start_time = datetime.now().isoformat()
-    subprocess.run(
-        ['7z', 'a', f'-t{archive_type}', str(archive_path)] + [str(f) for f in files],
-        check=True,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
-    archive_end = time.time()
-    archive_duration = archive_end - archive_start
-    archive_speed = total_size / archive_duration if archive_duration > 0 else 0
-
-    # Запись результатов архивации в CSV
-    with open(PERF_RESULTS, 'a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            test_name,
-            "Archive",
-            total_size,
-            file_count,
-            archive_start_time,
-            datetime.now().isoformat(),
-            round(archive_duration, 3),
-            round(archive_speed, 2)
-        ])
-
-    # Тест распаковки
-    extract_dir = EXTRACT_DIR / f"extract_{test_name.replace(' ', '_')}"
-    extract_dir.mkdir(parents=True, exist_ok=True)
-
-    extract_start = time.time()
-    extract_start_time = datetime.now().isoformat()
-    subprocess.run(
-        ['7z', 'x', f'-t{archive_type}', str(archive_path), f'-o{extract_dir}', '-y'],
-        check=True,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
-    extract_end = time.time()
-    extract_duration = extract_end - extract_start
-    extract_speed = total_size / extract_duration if extract_duration > 0 else 0
-
-    # Запись результатов распаковки в CSV
-    with open(PERF_RESULTS, 'a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            test_name,
-            "Extract",
-            total_size,
-            file_count,
-            extract_start_time,
-            datetime.now().isoformat(),
-            round(extract_duration, 3),
-            round(extract_speed, 2)
-        ])
+    archive_dir, extract_root = output_dirs()
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archive_path = archive_dir / archive_file
+    extract_dir = extract_root / f"extract_{test_name.replace(' ', '_')}"
+    cold = IO.get('cache', 'warm') == 'cold'
+    fsync = IO.get('fsync', False)
+
+    def archive_trial():
+        # 7z a дописывает в существующий архив, поэтому каждый прогон начинается с нуля
+        if archive_path.exists():
+            archive_path.unlink()
+        if cold:
+            evict_page_cache(files)
+        return measure_operation(
+            test_name, "Archive",
+            ['7z', 'a', f'-t{archive_type}', str(archive_path)] + [str(f) for f in files],
+            sync=[archive_path] if fsync else None, limits=limits
+        )
+
+    def extract_trial():
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        extract_dir.mkdir(parents=True, exist_ok=True)
+        if cold:
+            evict_page_cache([archive_path])
+        return measure_operation(
+            test_name, "Extract",
+            ['7z', 'x', f'-t{archive_type}', str(archive_path), f'-o{extract_dir}', '-y'],
+            sync=[extract_dir] if fsync else None, limits=limits
+        )
+
+    warmup = TRIALS.get('warmup', 1)
+    repeat = TRIALS.get('repeat', 5)
+    summaries = {}
+    # Результаты не в режиме по умолчанию хранятся под отдельной операцией со своей базовой линией
+    mode = io_mode()
+    input_bytes = sum(Path(f).stat().st_size for f in files)
+    compression_ratio = None
+
+    for operation, trial in (("Archive", archive_trial), ("Extract", extract_trial)):
+        measurements = run_trials(trial, warmup, repeat)
+        if compression_ratio is None:
+            # Размер архива после последнего прогона: доля от исходных данных
+            compression_ratio = round(archive_path.stat().st_size / input_bytes, 4) if input_bytes else 1.0
+        for number, (measurement, cpu) in enumerate(measurements, 1):
+            write_result_row(store, test_name, operation_label(operation), total_size, file_count, measurement,
+                             cpu, number, compression_ratio=compression_ratio, io_mode=mode,
+                             limits=limits_label(limits), **metrics)
+        summaries[operation] = summarize(
+            [measurement['duration'] for measurement, _ in measurements],
+            TRIALS.get('confidence', 0.95),
+            TRIALS.get('outliers', 'iqr')
+        )
 
     # Очистка
     if archive_path.exists():
@@ -230,56 +328,513 @@ def run_performance_test(test_name, files, total_size, file_count):
     shutil.rmtree(extract_dir, ignore_errors=True)
 
     return {
-        "archive_time": archive_duration,
-        "extract_time": extract_duration
+        "archive": summaries["Archive"],
+        "extract": summaries["Extract"],
+        "compression_ratio": compression_ratio
     }
 
 
+# Параметры проверки регрессий
+BASELINE = config.get('performance', {}).get('baseline', {})
+
+
+@pytest.fixture(scope="session")
+def regression_gate(request, results_store):
+    """Сравнивает пропускную способность сессии с сохраненной базовой линией"""
+    yield
+    if not BASELINE.get('enabled', True):
+        return
+    regressions = run_gate(results_store.samples('speed_mbps'), results_store.fingerprint, BASELINE)
+    for entry in regressions:
+        print(f"РЕГРЕССИЯ: {entry['test_case']} / {entry['operation']}: {entry['change']:+.1%}")
+    # Решение о провале сессии принимает pytest_sessionfinish в conftest
+    request.session.perf_regressions = regressions
+
+
+# Параметры подбора размера тест-кейсов
+CALIBRATION = config.get('performance', {}).get('calibration', {})
+
+
+def calibrate_case(test_case, make_files, limits=None):
+    """
+    Увеличивает размеры файлов тест-кейса в growth раз, пока архивация не займет min_seconds
+    Пробная архивация идет в тех же условиях, что и замер: ограничения процесса и режим ввода-вывода
+    :return: кортеж (файлы, размеры файлов в MB, множитель)
+    """
+    min_seconds = CALIBRATION.get('min_seconds', 2.0)
+    growth = CALIBRATION.get('growth', 2)
+    max_total_mb = CALIBRATION.get('max_total_mb', 4096)
+    archive_type = config['archive'].get('type', '7z')
+    archive_dir, _ = output_dirs()
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    probe = archive_dir / f"calibrate_{test_case['name'].replace(' ', '_')}.{archive_type}"
+    profile = test_case.get('profile', 'random')
+
+    scale = 1
+    while True:
+        sizes = [size * scale for size in test_case['file_sizes']]
+        files = make_files(sizes, prefix=test_case['name'], profile=profile)
+        if probe.exists():
+            probe.unlink()
+        if IO.get('cache', 'warm') == 'cold':
+            evict_page_cache(files)
+        duration = run_measured(
+            ['7z', 'a', f'-t{archive_type}', str(probe)] + [str(f) for f in files],
+            sync=[probe] if IO.get('fsync', False) else None, limits=limits
+        )['duration']
+        probe.unlink()
+        print(f"\nКалибровка {test_case['name']}: {sum(sizes)} MB за {duration:.3f} сек")
+        # Остановка по длительности или по лимиту объема следующего шага
+        if duration >= min_seconds or sum(sizes) * growth > max_total_mb:
+            return files, sizes, scale
+        # Файлы пройденного шага больше не нужны, на диске лежит только текущий
+        for file_path in files:
+            file_path.unlink()
+        scale *= growth
+
+
 # Получаем тест-кейсы из конфига
 test_cases = config.get('performance', {}).get('test_cases', [])
 
 
 # Параметризованный тест производительности
 @pytest.mark.parametrize("test_case", test_cases, ids=lambda tc: tc['name'])
-def test_file_performance(make_files, init_csv_report, test_case):
+def test_file_performance(make_files, results_store, regression_gate, test_case):
     """Параметризованный тест производительности"""
-    # Создаем файлы
-    files = make_files(test_case['file_sizes'], prefix=test_case['name'])
+    # Создаем файлы; в режиме калибровки их размер подбирается под длительность замера
+    profile = test_case.get('profile', 'random')
+    limits = case_limits(test_case)
+    if CALIBRATION.get('enabled', False):
+        files, sizes, scale = calibrate_case(test_case, make_files, limits)
+    else:
+        sizes, scale = test_case['file_sizes'], 1
+        files = make_files(sizes, prefix=test_case['name'], profile=profile)
 
     # Выполняем тест и записываем результаты
     results = run_performance_test(
         test_case['name'],
         files,
-        test_case['total_size'],
-        test_case['file_count']
+        sum(sizes),
+        test_case['file_count'],
+        results_store,
+        limits=limits,
+        size_scale=scale
     )
 
     # Для анализа внутри теста (необязательно)
-    print(f"\nРезультаты для {test_case['name']}:")
-    print(f"  Архивация: {results['archive_time']:.3f} сек")
-    print(f"  Распаковка: {results['extract_time']:.3f} сек")
+    print(f"\nРезультаты для {test_case['name']} ({sum(sizes)} MB, данные {profile}, "
+          f"архив {results['compression_ratio']:.1%} от исходного размера):")
+    for label, key in (("Архивация", 'archive'), ("Распаковка", 'extract')):
+        summary = results[key]
+        print(f"  {label}: медиана {summary['median']:.3f} сек, p95 {summary['p95']:.3f} сек, "
+              f"CI [{summary['ci_low']:.3f}; {summary['ci_high']:.3f}] (n={summary['n']})")
 
 
-# -------------------- Анализ результатов --------------------
+# -------------------- Масштабирование по потокам --------------------
+
+# Параметры прогона по числу потоков 7z (-mmt)
+SWEEP = config.get('performance', {}).get('thread_sweep', {})
 
-def analyze_performance_results():
-    """Анализирует результаты производительности и выводит сравнение"""
-    if not PERF_RESULTS.exists():
-        print("Файл с результатами не найден")
-        return
 
+def run_thread_sweep(test_name, files, total_size, file_count, store):
+    """
+    Архивация с разным числом потоков -mmt и, при affinity, привязкой к стольким же CPU
+    :return: кортеж (точки кривой масштабирования, колено кривой)
+    """
+    archive_type = config['archive'].get('type', '7z')
+    archive_path = PERF_ARCHIVE_DIR / f"sweep_{test_name.replace(' ', '_')}.{archive_type}"
+    available = sorted(os.sched_getaffinity(0))
+    warmup = TRIALS.get('warmup', 1)
+    repeat = TRIALS.get('repeat', 5)
+
+    measurements = {}
+    for threads in sorted({1, *SWEEP.get('threads', [1, 2, 4])}):
+        # Привязка к CPU через taskset: preexec_fn небезопасен, пока работает поток CpuSampler
+        limits = {'cpus': available[:threads]} if SWEEP.get('affinity', False) else None
+
+        def archive_trial():
+            if archive_path.exists():
+                archive_path.unlink()
+            return measure_operation(
+                test_name, f"Archive-mmt{threads}",
+                ['7z', 'a', f'-t{archive_type}', f'-mmt{threads}', str(archive_path)] + [str(f) for f in files],
+                limits=limits
+            )
+
+        measurements[threads] = run_trials(archive_trial, warmup, repeat)
+
+    if archive_path.exists():
+        archive_path.unlink()
+
+    curve, knee = scaling_curve(
+        {threads: [measurement['duration'] for measurement, _ in runs] for threads, runs in measurements.items()},
+        SWEEP.get('min_efficiency', 0.7)
+    )
+    for point in curve:
+        for number, (measurement, cpu) in enumerate(measurements[point['threads']], 1):
+            write_result_row(store, test_name, f"Archive-mmt{point['threads']}", total_size, file_count,
+                             measurement, cpu, number, threads=point['threads'],
+                             speedup=round(point['speedup'], 3), efficiency=round(point['efficiency'], 3),
+                             knee_threads=knee)
+    return curve, knee
+
+
+sweep_cases = [tc for tc in test_cases if not SWEEP.get('cases') or tc['name'] in SWEEP['cases']]
+
+
+@pytest.mark.skipif(not SWEEP.get('enabled', False), reason="thread_sweep выключен в config.yaml")
+@pytest.mark.parametrize("test_case", sweep_cases, ids=lambda tc: tc['name'])
+def test_thread_scaling(make_files, results_store, test_case):
+    """Кривая ускорения архивации по числу потоков"""
+    files = make_files(test_case['file_sizes'], prefix=test_case['name'], profile=test_case.get('profile', 'random'))
+    curve, knee = run_thread_sweep(test_case['name'], files, sum(test_case['file_sizes']),
+                                   test_case['file_count'], results_store)
+
+    print(f"\nМасштабирование {test_case['name']} (affinity: {SWEEP.get('affinity', False)}):")
+    print(f"{'Потоки':>6} | {'Медиана':>8} | {'Ускорение':>9} | {'Эффективность':>13}")
+    for point in curve:
+        print(f"{point['threads']:>6} | {point['median']:>8.3f} | {point['speedup']:>9.2f} | "
+              f"{point['efficiency']:>13.0%}")
+    print(f"Колено кривой: {knee} потоков")
+
+
+# -------------------- Матрица методов сжатия --------------------
+
+# Параметры перебора метода, уровня и размера словаря
+MATRIX = config.get('performance', {}).get('method_matrix', {})
+
+# Параметр размера словаря (памяти модели) для методов, где он есть
+DICTIONARY_OPTIONS = {'LZMA': 'd', 'LZMA2': 'd', 'PPMd': 'mem'}
+
+
+def matrix_combinations():
+    """Сочетания (метод, уровень, словарь) без повторов"""
+    combinations = []
+    for method in MATRIX.get('methods', ['LZMA2', 'PPMd', 'BZip2', 'Deflate']):
+        # Методы без размера словаря не размножаются по dictionaries
+        dictionaries = MATRIX.get('dictionaries', [None]) if method in DICTIONARY_OPTIONS else [None]
+        for level in MATRIX.get('levels', [1, 5, 9]):
+            for dictionary in dictionaries:
+                combinations.append((method, level, dictionary))
+    return list(dict.fromkeys(combinations))
+
+
+def combination_label(method, level, dictionary):
+    return f"{method} mx{level}" + (f" d={dictionary}" if dictionary else "")
+
+
+def run_method_matrix(test_name, files, total_size, file_count, store):
+    """
+    Архивация и распаковка тест-кейса всеми сочетаниями метода, уровня и словаря
+    :return: список словарей: label, method, level, dictionary, input_bytes, archive_bytes,
+             compress_s, decompress_s (медианы)
+    """
+    archive_path = PERF_ARCHIVE_DIR / f"matrix_{test_name.replace(' ', '_')}.7z"
+    extract_dir = EXTRACT_DIR / f"matrix_{test_name.replace(' ', '_')}"
+    input_bytes = sum(Path(f).stat().st_size for f in files)
+    warmup = TRIALS.get('warmup', 1)
+    repeat = MATRIX.get('repeat', 3)
+
+    results = []
+    # Файлы корпуса создаются один раз и проходят все сочетания;
+    # распаковка идет сразу после архивации, пока архив в кеше страниц
+    for method, level, dictionary in matrix_combinations():
+        label = combination_label(method, level, dictionary)
+        codec = method + (f":{DICTIONARY_OPTIONS[method]}={dictionary}" if dictionary else "")
+
+        def archive_trial():
+            if archive_path.exists():
+                archive_path.unlink()
+            return measure_operation(
+                test_name, f"Archive-{label.replace(' ', '_')}",
+                ['7z', 'a', '-t7z', f'-m0={codec}', f'-mx{level}', str(archive_path)] + [str(f) for f in files]
+            )
+
+        def extract_trial():
+            shutil.rmtree(extract_dir, ignore_errors=True)
+            extract_dir.mkdir(parents=True, exist_ok=True)
+            return measure_operation(
+                test_name, f"Extract-{label.replace(' ', '_')}",
+                ['7z', 'x', str(archive_path), f'-o{extract_dir}', '-y']
+            )
+
+        result = {'label': label, 'method': method, 'level': level, 'dictionary': dictionary,
+                  'input_bytes': input_bytes}
+        for operation, trial, key in (("Archive", archive_trial, 'compress_s'),
+                                      ("Extract", extract_trial, 'decompress_s')):
+            measurements = run_trials(trial, warmup, repeat)
+            if key == 'compress_s':
+                result['archive_bytes'] = archive_path.stat().st_size
+            for number, (measurement, cpu) in enumerate(measurements, 1):
+                write_result_row(store, test_name, f"{operation} {label}", total_size, file_count,
+                                 measurement, cpu, number, method=method, level=level, dictionary=dictionary,
+                                 archive_bytes=result['archive_bytes'],
+                                 compression_ratio=round(result['archive_bytes'] / input_bytes, 4))
+            result[key] = statistics.median(measurement['duration'] for measurement, _ in measurements)
+        results.append(result)
+
+    if archive_path.exists():
+        archive_path.unlink()
+    shutil.rmtree(extract_dir, ignore_errors=True)
+    return results
+
+
+def print_pareto_report(results_by_profile):
+    """Фронт Парето 'степень сжатия - скорость архивации' по профилям данных"""
+    for profile, results in results_by_profile.items():
+        # Сочетание оценивается суммарно по всем тест-кейсам профиля
+        totals = {}
+        for result in results:
+            total = totals.setdefault(result['label'], dict.fromkeys(
+                ('input_bytes', 'archive_bytes', 'compress_s', 'decompress_s'), 0))
+            for key in total:
+                total[key] += result[key]
+        points = [{
+            'label': label,
+            'ratio': total['archive_bytes'] / total['input_bytes'] if total['input_bytes'] else 1.0,
+            'compress_mbps': total['input_bytes'] / 1024 / 1024 / total['compress_s'],
+            'decompress_mbps': total['input_bytes'] / 1024 / 1024 / total['decompress_s']
+        } for label, total in totals.items()]
+        frontier = {point['label'] for point in pareto_frontier(points, 'ratio', 'compress_mbps')}
+
+        print(f"\nМетоды сжатия, данные {profile} (* - фронт Парето):")
+        print("-" * 72)
+        print(f"  {'Сочетание':<26} | {'Сжатие':>7} | {'Архивация MB/s':>14} | {'Распаковка MB/s':>15}")
+        print("-" * 72)
+        for point in sorted(points, key=lambda p: p['ratio']):
+            mark = '*' if point['label'] in frontier else ' '
+            print(f"{mark} {point['label']:<26} | {point['ratio']:>7.1%} | {point['compress_mbps']:>14.2f} | "
+                  f"{point['decompress_mbps']:>15.2f}")
+
+
+@pytest.fixture(scope="session")
+def matrix_report():
+    """Собирает результаты матрицы методов по профилям данных и выводит фронт Парето"""
+    results_by_profile = {}
+    yield results_by_profile
+    print_pareto_report(results_by_profile)
+
+
+matrix_cases = [tc for tc in test_cases if not MATRIX.get('cases') or tc['name'] in MATRIX['cases']]
+
+
+@pytest.mark.skipif(not MATRIX.get('enabled', False), reason="method_matrix выключен в config.yaml")
+@pytest.mark.parametrize("test_case", matrix_cases, ids=lambda tc: tc['name'])
+def test_method_matrix(make_files, results_store, matrix_report, test_case):
+    """Степень сжатия и скорость для сочетаний метода, уровня и словаря"""
+    profile = test_case.get('profile', 'random')
+    files = make_files(test_case['file_sizes'], prefix=test_case['name'], profile=profile)
+    results = run_method_matrix(test_case['name'], files, sum(test_case['file_sizes']),
+                                test_case['file_count'], results_store)
+    matrix_report.setdefault(profile, []).extend(results)
+
+
+# -------------------- Одновременная нагрузка --------------------
+
+# Параметры прогона с N одновременными заданиями
+LOAD = config.get('performance', {}).get('load', {})
+
+
+def run_load_test(test_case, make_files, store):
+    """
+    Одновременные задания архивации, затем распаковки, каждое над своим корпусом
+    :return: {операция: точки contention_curve}
+    """
+    name = test_case['name']
+    archive_type = config['archive'].get('type', '7z')
+    levels = sorted({1, *LOAD.get('jobs', [1, 2, 4])})
+    rounds = LOAD.get('rounds', 3)
+    limits = case_limits(test_case)
+    input_mb = sum(test_case['file_sizes'])
+
+    # Отдельные корпуса: задания не делят входные файлы в кеше страниц
+    corpora = [make_files(test_case['file_sizes'], prefix=f"{name} job{job}",
+                          profile=test_case.get('profile', 'random'))
+               for job in range(levels[-1])]
+    archives = [PERF_ARCHIVE_DIR / f"load_{name.replace(' ', '_')}_{job}.{archive_type}" for job in range(levels[-1])]
+    extract_dirs = [EXTRACT_DIR / f"load_{name.replace(' ', '_')}_{job}" for job in range(levels[-1])]
+
+    def archive_job(job):
+        if archives[job].exists():
+            archives[job].unlink()
+        return run_measured(['7z', 'a', f'-t{archive_type}', str(archives[job])] + [str(f) for f in corpora[job]],
+                            limits=limits)
+
+    def extract_job(job):
+        shutil.rmtree(extract_dirs[job], ignore_errors=True)
+        extract_dirs[job].mkdir(parents=True, exist_ok=True)
+        return run_measured(['7z', 'x', f'-t{archive_type}', str(archives[job]), f'-o{extract_dirs[job]}', '-y'],
+                            limits=limits)
+
+    curves = {}
+    # Задания - отдельные процессы 7z; потоки пула только запускают их и ждут в wait4
+    with ThreadPoolExecutor(max_workers=levels[-1]) as pool:
+        # Распаковка идет после архивации: к ней готовы архивы всех заданий
+        for operation, job in (("Archive", archive_job), ("Extract", extract_job)):
+            for _ in range(TRIALS.get('warmup', 1)):
+                job(0)
+            measured = {}
+            for jobs in levels:
+                level = measured[jobs] = {'latencies': [], 'mbps': [], 'runs': []}
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    runs = list(pool.map(job, range(jobs)))
+                    wall = time.perf_counter() - start
+                    level['latencies'] += [measurement['duration'] for measurement in runs]
+                    level['mbps'].append(input_mb * jobs / wall)
+                    level['runs'] += runs
+
+            curve = contention_curve(measured)
+            for point in curve:
+                for number, measurement in enumerate(measured[point['jobs']]['runs'], 1):
+                    store.record(
+                        name, f"{operation} x{point['jobs']}", input_mb, test_case['file_count'],
+                        measurement['start_time'], measurement['end_time'], measurement['duration'], number,
+                        user_s=round(measurement['user_s'], 3),
+                        sys_s=round(measurement['sys_s'], 3),
+                        max_rss_mb=round(measurement['max_rss_kb'] / 1024, 1),
+                        jobs=point['jobs'],
+                        aggregate_mbps=round(point['aggregate_mbps'], 2),
+                        slowdown=round(point['slowdown'], 3),
+                        limits=limits_label(limits)
+                    )
+            curves[operation] = curve
+
+    for job in range(levels[-1]):
+        if archives[job].exists():
+            archives[job].unlink()
+        shutil.rmtree(extract_dirs[job], ignore_errors=True)
+    return curves
+
+
+def print_contention_curve(title, curve):
+    print(f"\n{title}:")
+    print(f"{'Заданий':>7} | {'MB/s всего':>10} | {'p50, с':>8} | {'p95, с':>8} | {'max, с':>8} | {'Замедление':>10}")
+    for point in curve:
+        print(f"{point['jobs']:>7} | {point['aggregate_mbps']:>10.2f} | {point['p50']:>8.3f} | "
+              f"{point['p95']:>8.3f} | {point['max']:>8.3f} | {point['slowdown']:>9.2f}x")
+
+
+load_cases = [tc for tc in test_cases if not LOAD.get('cases') or tc['name'] in LOAD['cases']]
+
+
+@pytest.mark.skipif(not LOAD.get('enabled', False), reason="load выключен в config.yaml")
+@pytest.mark.parametrize("test_case", load_cases, ids=lambda tc: tc['name'])
+def test_concurrent_load(make_files, results_store, test_case):
+    """Суммарная пропускная способность и задержки при росте числа одновременных заданий"""
+    curves = run_load_test(test_case, make_files, results_store)
+    for operation, curve in curves.items():
+        print_contention_curve(f"{test_case['name']}, {operation}: одновременные задания", curve)
+
+
+# -------------------- Множество мелких файлов --------------------
+
+# Параметры деревьев из мелких файлов
+SMALL_FILES = config.get('performance', {}).get('small_files', {})
+
+
+def run_small_files_test(entries, store):
+    """
+    Архивация, листинг, распаковка и проверка дерева из entries мелких файлов
+    :return: кортеж ({операция: медиана длительности}, отчет генерации)
+    """
+    depth = SMALL_FILES.get('depth', 3)
+    fanout = SMALL_FILES.get('fanout', 16)
+    size = SMALL_FILES.get('file_size', 1024)
+    workers = SMALL_FILES.get('workers')
+    archive_type = config['archive'].get('type', '7z')
+    limits = case_limits(SMALL_FILES)
+    name = f"Tree {entries} files"
+
+    root = DATA_DIR / "small_files" / f"tree_{entries}"
+    source = root / "src"
+    archive_path = root / f"tree.{archive_type}"
+    extract_dir = root / "extracted"
+    shutil.rmtree(root, ignore_errors=True)
+
+    corpus_config = config.get('performance', {}).get('corpus', {})
+    report = generate_tree(str(source), entries, depth, fanout, size, corpus_config.get('seed', 1337),
+                           SMALL_FILES.get('profile', 'text'), workers)
+    print(f"\nДерево {entries} файлов (глубина {depth}, ветвление {fanout}) создано за {report['seconds']:.1f} сек")
+
+    # Каталог передается 7z целиком: список из миллиона путей не поместится в командную строку
+    def archive_trial():
+        if archive_path.exists():
+            archive_path.unlink()
+        return run_measured(['7z', 'a', f'-t{archive_type}', str(archive_path), str(source)], limits=limits)
+
+    def list_trial():
+        return run_measured(['7z', 'l', str(archive_path)], limits=limits)
+
+    def parse_trial():
+        # Листинг -slt разбирается потоком: в памяти нет ни вывода, ни списка записей
+        start_time = datetime.now().isoformat()
+        start = time.perf_counter()
+        with subprocess.Popen(['7z', 'l', '-slt', str(archive_path)], stdout=subprocess.PIPE, text=True) as process:
+            files = sum(1 for entry in iter_listing(process.stdout) if not entry.is_dir)
+        duration = time.perf_counter() - start
+        assert process.returncode == 0, "7z l -slt завершилась с ошибкой"
+        assert files == entries, f"В листинге {files} файлов, ожидалось {entries}"
+        return {'start_time': start_time, 'end_time': datetime.now().isoformat(), 'duration': duration}
+
+    def extract_trial():
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        extract_dir.mkdir(parents=True)
+        return run_measured(['7z', 'x', str(archive_path), f'-o{extract_dir}', '-y'], limits=limits)
+
+    def verify_trial():
+        start_time = datetime.now().isoformat()
+        start = time.perf_counter()
+        status, message = verify_tree(str(source), str(extract_dir / source.name), workers)
+        duration = time.perf_counter() - start
+        assert status, message
+        return {'start_time': start_time, 'end_time': datetime.now().isoformat(), 'duration': duration}
+
+    results = {}
+    repeat = SMALL_FILES.get('repeat', 1)
+    # Проверка идет последней, по результату последней распаковки
+    for operation, trial in (("Archive", archive_trial), ("List", list_trial), ("ListParse", parse_trial),
+                             ("Extract", extract_trial), ("Verify", verify_trial)):
+        measurements = [trial() for _ in range(repeat)]
+        for number, measurement in enumerate(measurements, 1):
+            store.record(
+                name, operation, entries * size / 1024 / 1024, entries,
+                measurement['start_time'], measurement['end_time'], measurement['duration'], number,
+                entries=entries, depth=depth, fanout=fanout,
+                per_entry_us=round(measurement['duration'] / entries * 1e6, 3),
+                limits=limits_label(limits)
+            )
+        results[operation] = statistics.median(measurement['duration'] for measurement in measurements)
+
+    shutil.rmtree(root, ignore_errors=True)
+    return results, report
+
+
+@pytest.mark.skipif(not SMALL_FILES.get('enabled', False), reason="small_files выключен в config.yaml")
+@pytest.mark.parametrize("entries", SMALL_FILES.get('entries', []), ids=lambda n: f"{n}_files")
+def test_small_files_scaling(results_store, entries):
+    """Стоимость операций 7z в пересчете на один файл при росте числа файлов"""
+    results, _ = run_small_files_test(entries, results_store)
+    print(f"{'Операция':<10} | {'Время, с':>9} | {'мкс на файл':>12}")
+    for operation, duration in results.items():
+        print(f"{operation:<10} | {duration:>9.3f} | {duration / entries * 1e6:>12.2f}")
+
+
+# -------------------- Анализ результатов --------------------
+
+def analyze_performance_results(store):
+    """Анализирует результаты производительности и сравнивает распределения замеров"""
     results = {}
-    with open(PERF_RESULTS, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            test_name = row['Test Case']
-            operation = row['Operation']
-            duration = float(row['Duration (s)'])
+    for (test_name, operation), durations in store.samples('duration_s').items():
+        results.setdefault(test_name, {})[operation] = durations
 
-            if test_name not in results:
-                results[test_name] = {}
+    if not results:
+        print("Результаты производительности не найдены")
+        return
 
-            results[test_name][operation] = duration
+    confidence = TRIALS.get('confidence', 0.95)
+    outliers = TRIALS.get('outliers', 'iqr')
+    alpha = TRIALS.get('alpha', 0.05)
 
     # Сравнение наборов файлов
     comparison_sets = [
@@ -289,33 +844,39 @@ def analyze_performance_results():
     ]
 
     print("\nСравнительная таблица производительности:")
-    print("-" * 65)
-    print(f"{'Тест':<20} | {'Операция':<10} | {'Время (сек)':<12} | {'Разница':<12}")
-    print("-" * 65)
+    print("-" * 100)
+    print(f"{'Тест':<20} | {'Операция':<10} | {'n':>3} | {'Медиана':>8} | {'p95':>8} | "
+          f"{'СКО':>8} | {'Доверительный интервал':<22}")
+    print("-" * 100)
 
     for test_name, data in results.items():
-        for operation, duration in data.items():
-            print(f"{test_name:<20} | {operation:<10} | {duration:<12.3f} |")
-
-    print("\nСравнение наборов файлов:")
-    print("-" * 65)
+        for operation, durations in data.items():
+            summary = summarize(durations, confidence, outliers)
+            print(f"{test_name:<20} | {operation:<10} | {summary['n']:>3} | {summary['median']:>8.3f} | "
+                  f"{summary['p95']:>8.3f} | {summary['stdev']:>8.3f} | "
+                  f"[{summary['ci_low']:.3f}; {summary['ci_high']:.3f}]")
+
+    print("\nСравнение наборов файлов (U-критерий Манна-Уитни):")
+    print("-" * 100)
     for set1, set2 in comparison_sets:
         if set1 in results and set2 in results:
-            archive_diff = results[set2]['Archive'] - results[set1]['Archive']
-            extract_diff = results[set2]['Extract'] - results[set1]['Extract']
-
             print(f"Сравнение: {set1} vs {set2}")
-            print(
-                f"  Архивация: {results[set1]['Archive']:.3f} сек vs {results[set2]['Archive']:.3f} сек ({archive_diff:+.3f} сек)")
-            print(
-                f"  Распаковка: {results[set1]['Extract']:.3f} сек vs {results[set2]['Extract']:.3f} сек ({extract_diff:+.3f} сек)")
-            print("-" * 65)
+            for label, operation in (("Архивация", operation_label('Archive')),
+                                     ("Распаковка", operation_label('Extract'))):
+                if operation not in results[set1] or operation not in results[set2]:
+                    continue
+                result = compare(results[set1][operation], results[set2][operation], alpha)
+                verdict = "значимо" if result['significant'] else "незначимо"
+                print(
+                    f"  {label}: {result['baseline_median']:.3f} сек vs {result['candidate_median']:.3f} сек "
+                    f"({result['change']:+.1%}, p={result['p_value']:.3f}, {verdict})")
+            print("-" * 100)
 
 
 # Фикстура для анализа результатов в конце сессии
 @pytest.fixture(scope="session", autouse=True)
-def final_analysis(request):
+def final_analysis(request, results_store):
     """Анализирует результаты после всех тестов"""
     yield
     if any(item.nodeid for item in request.session.items if 'test_file_performance' in item.nodeid):
-        analyze_performance_results()
+        analyze_performance_results(results_store)
@@ -0,0 +1,55 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncRemoteExecutor:
+    """Асинхронный фронтенд к SSHClient: операции выполняются в пуле потоков"""
+
+    def __init__(self, ssh_client, max_concurrency=8):
+        # Каждая операция занимает отдельный канал на общем транспорте.
+        # OpenSSH по умолчанию разрешает 10 сессий (MaxSessions) на соединение.
+        self.ssh_client = ssh_client
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def _call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def run(self, command, check=True, **kwargs):
+        """Выполняет команду на сервере, не блокируя цикл событий"""
+        return await self._call(self.ssh_client.run_ssh_command, command, check, **kwargs)
+
+    async def upload(self, local_path, remote_path):
+        """Загружает файл через собственный SFTP-канал"""
+        return await self._call(self._with_sftp, self.ssh_client.upload_file, local_path, remote_path)
+
+    async def download(self, remote_path, local_path):
+        """Скачивает файл через собственный SFTP-канал"""
+        return await self._call(self._with_sftp, self.ssh_client.download_file, remote_path, local_path)
+
+    def _with_sftp(self, transfer, src, dst):
+        # Общая SFTP-сессия сериализует запросы, поэтому параллельным передачам нужен свой канал
+        sftp = self.ssh_client.client.open_sftp()
+        try:
+            return transfer(src, dst, sftp=sftp)
+        finally:
+            sftp.close()
+
+    async def gather(self, commands, check=True):
+        """Выполняет команды параллельно, результаты - в порядке команд"""
+        return await asyncio.gather(*(self.run(command, check) for command in commands))
+
+    def run_all(self, commands, check=True):
+        """Синхронная обертка над gather для фикстур и тестов"""
+        return asyncio.run(self.gather(commands, check))
+
+    def run_tasks(self, *coroutines):
+        """Синхронно дожидается набора произвольных корутин"""
+        async def _wait():
+            return await asyncio.gather(*coroutines)
+        return asyncio.run(_wait())
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# Агент замеров на удаленном сервере.
+#
+# Загружается на сервер один раз за сессию и запускает измеряемую команду
+# локально, поэтому в замер не попадают открытие SSH-канала и сетевые задержки.
+# Во время работы команды загрузка CPU снимается по /proc/stat (без sysstat).
+# Ограничения (--limits: CPU, память, nice, ionice) накладываются префиксом
+# taskset/prlimit/nice/ionice перед командой.
+# Использует только стандартную библиотеку.
+#
+# Запуск: python3 bench_agent.py [--interval 0.05] [--limits JSON] [--series PATH] -- 7z a -t7z archive.7z file1 file2
+# Вывод: одна строка JSON с результатами замера. В нее попадают только итоги по CPU:
+# ряд замеров растет с длительностью и числом ядер, поэтому он пишется в файл --series.
+# python3 bench_agent.py --fingerprint выводит отпечаток окружения сервера.
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def read_proc_stat(path='/proc/stat'):
+    """
+    Чтение счетчиков CPU из /proc/stat
+    :return: словарь {'cpu': (busy, total), 'cpu0': (busy, total), ...}
+    """
+    counters = {}
+    with open(path) as f:
+        for line in f:
+            if not line.startswith('cpu'):
+                break
+            name, *values = line.split()
+            values = [int(v) for v in values]
+            # idle и iowait считаются простоем
+            idle = values[3] + (values[4] if len(values) > 4 else 0)
+            total = sum(values[:8])
+            counters[name] = (total - idle, total)
+    return counters
+
+
+def _core_names(counters):
+    """Имена ядер в порядке номеров: cpu2 перед cpu10"""
+    return sorted((name for name in counters if name != 'cpu'), key=lambda name: int(name[3:]))
+
+
+def _utilisation(before, after):
+    busy = after[0] - before[0]
+    total = after[1] - before[1]
+    return 100.0 * busy / total if total > 0 else 0.0
+
+
+class CpuSampler:
+    """Замер загрузки CPU по /proc/stat на время выполнения операции"""
+
+    def __init__(self, interval=0.05, path='/proc/stat'):
+        self.interval = interval
+        self.path = path
+        self.series = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._first = None
+        self._last = None
+        self._start = None
+
+    def _sample(self):
+        counters = read_proc_stat(self.path)
+        total = _utilisation(self._last['cpu'], counters['cpu'])
+        cores = [_utilisation(self._last[name], counters[name])
+                 for name in _core_names(counters) if name in self._last]
+        self.series.append((time.perf_counter() - self._start, total, cores))
+        self._last = counters
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._first = self._last = read_proc_stat(self.path)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        # Последний интервал захватывает хвост операции короче периода опроса
+        self._sample()
+        return self.summary()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def summary(self):
+        """
+        Итоги замера
+        :return: словарь: mean и peak по всем ядрам, per_core_mean, per_core_peak, series
+        """
+        totals = [total for _, total, _ in self.series]
+        core_names = _core_names(self._first)
+        per_core_mean = [round(_utilisation(self._first[name], self._last[name]), 1)
+                         for name in core_names]
+        per_core_peak = [round(max(cores[i] for _, _, cores in self.series), 1)
+                         for i in range(len(core_names))] if self.series else []
+        return {
+            'interval': self.interval,
+            'samples': len(self.series),
+            'mean': round(_utilisation(self._first['cpu'], self._last['cpu']), 1),
+            'peak': round(max(totals), 1) if totals else 0.0,
+            'per_core_mean': per_core_mean,
+            'per_core_peak': per_core_peak,
+            'series': [(round(t, 3), round(total, 1), [round(c, 1) for c in cores])
+                       for t, total, cores in self.series]
+        }
+
+
+# Классы ionice по имени
+IONICE_CLASSES = {'realtime': 1, 'best-effort': 2, 'idle': 3}
+
+
+def launcher_args(limits):
+    """
+    Префикс команды, накладывающий ограничения на запускаемый процесс
+    :param limits: словарь: cpus ("0-1" или список), memory_mb (prlimit --as), nice,
+                   ionice ("idle", "best-effort:4", "realtime:0")
+    :return: список аргументов; утилиты выполняют exec, поэтому rusage остается у того же процесса
+    """
+    if not limits:
+        return []
+    prefix = []
+    cpus = limits.get('cpus')
+    if cpus is not None:
+        prefix += ['taskset', '-c', cpus if isinstance(cpus, str) else ','.join(str(cpu) for cpu in cpus)]
+    if limits.get('memory_mb'):
+        prefix += ['prlimit', f"--as={int(limits['memory_mb'] * 1024 * 1024)}"]
+    if limits.get('nice') is not None:
+        prefix += ['nice', '-n', str(limits['nice'])]
+    if limits.get('ionice'):
+        name, _, level = str(limits['ionice']).partition(':')
+        prefix += ['ionice', '-c', str(IONICE_CLASSES.get(name, name))] + (['-n', level] if level else [])
+    return prefix
+
+
+def limits_label(limits):
+    """Краткая запись ограничений для отчетов, например 'cpus=0-1 mem=512MB nice=10'"""
+    parts = []
+    if limits:
+        cpus = limits.get('cpus')
+        if cpus is not None:
+            parts.append(f"cpus={cpus if isinstance(cpus, str) else ','.join(str(cpu) for cpu in cpus)}")
+        if limits.get('memory_mb'):
+            parts.append(f"mem={limits['memory_mb']}MB")
+        if limits.get('nice') is not None:
+            parts.append(f"nice={limits['nice']}")
+        if limits.get('ionice'):
+            parts.append(f"io={limits['ionice']}")
+    return ' '.join(parts) or 'none'
+
+
+def run_measured(args, interval=0.05, limits=None, series_path=None):
+    """
+    Запускает команду под ограничениями limits и возвращает время, rusage и код возврата
+    :param series_path: файл для ряда замеров CPU (None - ряд не сохраняется)
+    """
+    with tempfile.TemporaryFile() as err:
+        start_time = time.time()
+        sampler = CpuSampler(interval).start()
+        start = time.perf_counter()
+        process = subprocess.Popen(launcher_args(limits) + list(args), stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL, stderr=err)
+        # wait4 забирает процесс и возвращает его rusage
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        cpu = sampler.stop()
+        end_time = time.time()
+        series = cpu.pop('series')
+        if series_path:
+            with open(series_path, 'w') as f:
+                json.dump(series, f)
+        if os.WIFEXITED(status):
+            process.returncode = os.WEXITSTATUS(status)
+        else:
+            process.returncode = -os.WTERMSIG(status)
+
+        err.seek(0)
+        stderr = err.read()[-4096:].decode('utf-8', errors='replace')
+
+    cpu_time = usage.ru_utime + usage.ru_stime
+    return {
+        'command': args,
+        'exit_code': process.returncode,
+        'start_time': start_time,
+        'end_time': end_time,
+        'wall_s': wall,
+        'user_s': usage.ru_utime,
+        'sys_s': usage.ru_stime,
+        'cpu_percent': cpu_time / wall * 100 if wall > 0 else 0,
+        'max_rss_kb': usage.ru_maxrss,
+        'cpu': cpu,
+        'limits': limits_label(limits),
+        'series_path': series_path,
+        'stderr': stderr
+    }
+
+
+def host_fingerprint():
+    """Отпечаток окружения: модель CPU, число ядер, версия ядра и 7z"""
+    cpu_model = 'unknown'
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    cpu_model = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+
+    try:
+        banner = subprocess.run(['7z'], capture_output=True, text=True).stdout
+        version = next((line.split(':')[0].strip() for line in banner.splitlines() if '7-Zip' in line),
+                       'unknown')
+    except FileNotFoundError:
+        version = 'unknown'
+
+    return {
+        'cpu_model': cpu_model,
+        'cpu_count': os.cpu_count(),
+        'kernel': platform.release(),
+        '7z_version': version
+    }
+
+
+def main(argv):
+    if '--fingerprint' in argv:
+        print(json.dumps(host_fingerprint()))
+        return 0
+    if '--' not in argv:
+        print("usage: bench_agent.py [--interval SEC] [--limits JSON] [--series PATH] -- command [args...]",
+              file=sys.stderr)
+        return 2
+    options = argv[:argv.index('--')]
+    args = argv[argv.index('--') + 1:]
+    interval = float(options[options.index('--interval') + 1]) if '--interval' in options else 0.05
+    limits = json.loads(options[options.index('--limits') + 1]) if '--limits' in options else None
+    series_path = options[options.index('--series') + 1] if '--series' in options else None
+    record = run_measured(args, interval, limits, series_path)
+    print(json.dumps(record))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,7 +1,10 @@
 import os
 import zlib
 import re
+from collections import namedtuple
+from datetime import datetime
 import binascii
+import hashlib
 
 def verify_extracted_files(extract_dir, source_dir, expected_files):
     """Проверка корректности извлеченных файлов"""
@@ -68,9 +71,196 @@ def verify_crc(process_output, file_path, content=None):
         )
     return True, ""
 
-def verify_file_in_listing(output, filename):
-    """Проверка наличия файла в листинге архива"""
-    return filename in output
+def verify_file_in_listing(listing, filename):
+    """
+    Проверка наличия файла в листинге архива по точному пути
+    :param listing: индекс index_listing или вывод 7z l -slt
+    :raises ValueError: вывод не в формате -slt (например, обычный 7z l)
+    """
+    if isinstance(listing, str):
+        if not listing.startswith('Path = ') and '\nPath = ' not in listing:
+            raise ValueError("Ожидается вывод 7z l -slt, записи Path = не найдены")
+        listing = index_listing(iter_listing(listing.splitlines()))
+    return filename in listing
+
+
+ListingEntry = namedtuple('ListingEntry', ['path', 'size', 'packed_size', 'crc', 'attributes', 'mtime', 'is_dir'])
+
+
+def _listing_int(value):
+    return int(value) if value and value.isdigit() else None
+
+
+def _listing_mtime(value):
+    if not value:
+        return None
+    # 7z выводит до семи знаков дробной части секунды, datetime понимает шесть
+    try:
+        return datetime.fromisoformat(value[:26])
+    except ValueError:
+        return None
+
+
+class SltListingParser:
+    """Потоковый разбор вывода 7z l -slt: строки подаются по одной, записи передаются обработчику"""
+
+    def __init__(self, on_entry):
+        self.on_entry = on_entry
+        self.count = 0
+        self._fields = {}
+        self._in_entries = False
+
+    def feed(self, line):
+        line = line.rstrip('\r\n')
+        if not self._in_entries:
+            # Свойства самого архива идут до разделителя из десяти дефисов
+            self._in_entries = line == '----------'
+            return
+        if not line:
+            self._flush()
+            return
+        key, sep, value = line.partition(' =')
+        if sep:
+            self._fields[key] = value[1:] if value.startswith(' ') else value
+
+    def finish(self):
+        self._flush()
+
+    def _flush(self):
+        fields, self._fields = self._fields, {}
+        if 'Path' not in fields:
+            return
+        attributes = fields.get('Attributes', '')
+        self.count += 1
+        self.on_entry(ListingEntry(
+            path=fields['Path'],
+            size=_listing_int(fields.get('Size')),
+            packed_size=_listing_int(fields.get('Packed Size')),
+            crc=fields.get('CRC') or None,
+            attributes=attributes,
+            mtime=_listing_mtime(fields.get('Modified')),
+            is_dir=fields.get('Folder') == '+' or attributes.startswith('D')
+        ))
+
+
+def iter_listing(lines):
+    """Записи листинга 7z l -slt по одной; lines - любой итератор строк, например stdout процесса"""
+    pending = []
+    parser = SltListingParser(pending.append)
+    for line in lines:
+        parser.feed(line)
+        if pending:
+            yield from pending
+            pending.clear()
+    parser.finish()
+    yield from pending
+
+
+def index_listing(entries):
+    """Индекс записей листинга по пути"""
+    return {entry.path: entry for entry in entries}
+
+
+def check_listing(entries, expected, allow_extra=False, max_report=20):
+    """
+    Сверка листинга с ожидаемыми путями за один проход
+    :param entries: записи листинга (итератор; в памяти держится только множество ожидаемых путей)
+    :param expected: пути файлов, которые должны быть в архиве; каталоги лишними не считаются
+    :return: кортеж (статус, сообщение)
+    """
+    missing = set(expected)
+    unexpected = []
+    unexpected_count = 0
+    for entry in entries:
+        if entry.path in missing:
+            missing.discard(entry.path)
+        elif not allow_extra and not entry.is_dir:
+            unexpected_count += 1
+            if len(unexpected) < max_report:
+                unexpected.append(entry.path)
+
+    errors = [f"Файл {path} не найден в архиве" for path in sorted(missing)[:max_report]]
+    if len(missing) > max_report:
+        errors.append(f"... всего отсутствует: {len(missing)}")
+    errors += [f"Лишний файл в архиве: {path}" for path in unexpected]
+    if unexpected_count > len(unexpected):
+        errors.append(f"... всего лишних: {unexpected_count}")
+    return len(errors) == 0, "\n".join(errors)
+
+def manifest_command(remote_dir):
+    """Команда, строящая на сервере манифест дерева: размеры и SHA-256 файлов"""
+    return (
+        f"cd '{remote_dir}' && "
+        "find . -type f -printf '%s\\t%P\\n' && "
+        "echo '--' && "
+        "find . -type f -print0 | xargs -0 -r sha256sum"
+    )
+
+
+def parse_manifest(output):
+    """
+    Разбор вывода manifest_command
+    :param output: вывод команды
+    :return: словарь {путь: (размер, sha256)}
+    """
+    lines = output.splitlines()
+    separator = lines.index('--') if '--' in lines else len(lines)
+    manifest = {}
+    for line in lines[:separator]:
+        if line:
+            size, path = line.split('\t', 1)
+            manifest[path] = (int(size), None)
+
+    for line in lines[separator + 1:]:
+        if not line:
+            continue
+        digest, path = line.split(None, 1)
+        path = path.lstrip('*')
+        if path.startswith('./'):
+            path = path[2:]
+        size = manifest.get(path, (None, None))[0]
+        manifest[path] = (size, digest.lower())
+    return manifest
+
+
+def build_expected_manifest(test_files):
+    """Ожидаемый манифест из config['test_files']"""
+    expected = {}
+    for file_info in test_files:
+        content = file_info['content']
+        if file_info['type'] == 'binary' and content:
+            content = binascii.unhexlify(content)
+        elif file_info['type'] == 'text' and content:
+            content = content.encode('utf-8')
+        else:
+            content = b''
+        expected[file_info['path']] = (len(content), hashlib.sha256(content).hexdigest())
+    return expected
+
+
+def compare_manifest(actual, expected, allow_extra=True):
+    """
+    Сравнение фактического манифеста с ожидаемым
+    :param allow_extra: допускаются ли лишние файлы в фактическом дереве
+    :return: кортеж (статус, сообщение)
+    """
+    errors = []
+    for path, (size, digest) in expected.items():
+        if path not in actual:
+            errors.append(f"Файл {path} не извлечен")
+            continue
+        actual_size, actual_digest = actual[path]
+        if actual_size != size:
+            errors.append(f"Размер {path} не совпадает: ожидалось {size}, получено {actual_size}")
+        elif actual_digest != digest:
+            errors.append(f"SHA-256 {path} не совпадает: ожидалось {digest}, получено {actual_digest}")
+
+    if not allow_extra:
+        for path in sorted(set(actual) - set(expected)):
+            errors.append(f"Лишний файл {path}")
+
+    return len(errors) == 0, "\n".join(errors)
+
 
 def download_file(ssh_client, remote_path, local_path):
     """Скачивание файла с сервера по SFTP"""
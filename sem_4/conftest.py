@@ -5,10 +5,23 @@ import os
 import binascii
 import tempfile
 import stat
-import csv
+import json
 import re
+import shlex
+import time
+import queue
+import select
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from checkers import manifest_command, parse_manifest
+from corpus import CorpusCache
+from sshcheckers import stream_channel
+from async_remote import AsyncRemoteExecutor
+from results_db import ResultsStore
 
 # Загрузка конфигурации
 with open('config.yaml') as f:
@@ -22,55 +35,377 @@ ARCHIVE_FILE = config.get('archive', {}).get('file', '/home/mig/test_archive.7z'
 PERF_ARCHIVE_DIR = Path(config.get('paths', {}).get('perf_archive_dir', '/home/mig/perf_archives'))
 
 
-class SSHClient:
-    def __init__(self, ssh_client):
-        self.client = ssh_client
+# Размер блока для конвейерных SFTP-передач
+TRANSFER_CHUNK = config.get('transfer', {}).get('chunk_kb', 256) * 1024
 
-    def run_ssh_command(self, command, check=True):
-        """Выполняет команду на удаленном сервере через SSH"""
-        stdin, stdout, stderr = self.client.exec_command(command)
-        exit_status = stdout.channel.recv_exit_status()
-        output = stdout.read().decode().strip()
-        error = stderr.read().decode().strip()
 
-        if check and exit_status != 0:
-            raise Exception(f"SSH command failed ({exit_status}): {command}\n{error}")
-        return output
+class _ByteBudget:
+    """Ограничение суммарного объема одновременно скачиваемых данных"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._cond = threading.Condition()
 
-    def download_file(self, remote_path, local_path):
-        """Скачивает файл с сервера"""
-        sftp = self.client.open_sftp()
-        sftp.get(remote_path, local_path)
-        sftp.close()
+    def acquire(self, size):
+        with self._cond:
+            # Файл крупнее лимита пропускается, когда других передач нет
+            while self.in_flight and self.in_flight + size > self.limit:
+                self._cond.wait()
+            self.in_flight += size
 
-    def upload_file(self, local_path, remote_path):
-        """Загружает файл на сервер"""
-        sftp = self.client.open_sftp()
-        sftp.put(local_path, remote_path)
-        sftp.close()
+    def release(self, size):
+        with self._cond:
+            self.in_flight -= size
+            self._cond.notify_all()
 
-    def download_directory(self, remote_path, local_path):
-        """Рекурсивное скачивание директории"""
-        sftp = self.client.open_sftp()
 
-        if not os.path.exists(local_path):
-            os.makedirs(local_path)
+CommandResult = namedtuple('CommandResult', ['command', 'exit_code', 'stdout', 'stderr'])
 
-        for item in sftp.listdir(remote_path):
-            remote_item = f"{remote_path}/{item}"
-            local_item = os.path.join(local_path, item)
 
-            if stat.S_ISDIR(sftp.stat(remote_item).st_mode):
-                self.download_directory(remote_item, local_item)
+class RemoteShell:
+    """Одна удаленная оболочка, в которой пакетами выполняются команды"""
+
+    def __init__(self, client):
+        self.channel = client.get_transport().open_session()
+        self.channel.exec_command('sh')
+        self._out = b''
+        self._err = b''
+
+    @property
+    def closed(self):
+        return self.channel.closed or self.channel.exit_status_ready()
+
+    def _read_until(self, out_marker, err_marker, timeout=None):
+        """Читает stdout и stderr одновременно, пока не встретятся маркеры конца пакета"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while not out_marker.search(self._out) or err_marker not in self._err:
+            if self.channel.recv_ready():
+                self._out += self.channel.recv(65536)
+            elif self.channel.recv_stderr_ready():
+                self._err += self.channel.recv_stderr(65536)
+            elif self.channel.exit_status_ready():
+                raise Exception("Remote shell exited before batch completed")
             else:
-                sftp.get(remote_item, local_item)
+                if deadline and time.monotonic() > deadline:
+                    raise TimeoutError("Remote shell batch timed out")
+                # Канал сигнализирует через fileno и о stdout, и о stderr
+                select.select([self.channel], [], [], 0.1)
+
+    def run(self, commands, timeout=None):
+        """
+        Выполняет команды в открытой оболочке одним пакетом
+        :param commands: список команд
+        :return: список CommandResult в порядке команд
+        """
+        if not commands:
+            return []
+
+        token = uuid.uuid4().hex
+        script = []
+        for i, command in enumerate(commands):
+            # Команда выполняется в подоболочке без stdin, чтобы не съесть остаток пакета
+            script.append(
+                f"printf '{token}:B:{i}\\n'; printf '{token}:B:{i}\\n' >&2\n"
+                f"( {command}\n) </dev/null\n"
+                f"printf '\\n{token}:%d:E:{i}\\n' $?; printf '\\n{token}:E:{i}\\n' >&2\n"
+            )
+        self.channel.sendall(''.join(script).encode())
+
+        last = len(commands) - 1
+        out_marker = re.compile(rf"\n{token}:(-?\d+):E:{last}\n".encode())
+        err_marker = f"\n{token}:E:{last}\n".encode()
+        self._read_until(out_marker, err_marker, timeout)
+
+        out = self._out.decode(errors='replace')
+        err = self._err.decode(errors='replace')
+        results = []
+        for i, command in enumerate(commands):
+            begin = f"{token}:B:{i}\n"
+            out_begin = out.index(begin) + len(begin)
+            end = re.compile(rf"\n{token}:(-?\d+):E:{i}\n").search(out, out_begin)
+            err_begin = err.index(begin) + len(begin)
+            err_end = err.index(f"\n{token}:E:{i}\n", err_begin)
+
+            results.append(CommandResult(
+                command,
+                int(end.group(1)),
+                out[out_begin:end.start()].strip(),
+                err[err_begin:err_end].strip()
+            ))
+
+        # Отбрасываем прочитанное, оставляя возможный хвост следующего пакета
+        self._out = self._out[out_marker.search(self._out).end():]
+        self._err = self._err[self._err.index(err_marker) + len(err_marker):]
+        return results
+
+    def close(self):
+        self.channel.close()
 
-        sftp.close()
+
+class SSHClient:
+    def __init__(self, ssh_client):
+        self.client = ssh_client
+        self._sftp = None
+        self._shell = None
+        # Отчеты о передачах: путь, байты, секунды, MB/s
+        self.transfers = []
+
+    @property
+    def sftp(self):
+        """Долгоживущая SFTP-сессия, переоткрывается при обрыве канала"""
+        if self._sftp is None or self._sftp.get_channel().closed:
+            self._sftp = self.client.open_sftp()
+        return self._sftp
+
+    def _report_transfer(self, direction, remote_path, size, start):
+        duration = time.perf_counter() - start
+        speed = size / (1024 * 1024) / duration if duration > 0 else 0
+        report = {
+            'direction': direction,
+            'path': remote_path,
+            'bytes': size,
+            'seconds': duration,
+            'mb_per_s': speed
+        }
+        self.transfers.append(report)
+        return report
+
+    def run_ssh_command(self, command, check=True, on_line=None, stop_when=None, max_lines=None):
+        """
+        Выполняет команду на удаленном сервере через SSH
+        :param on_line: обработчик строк вывода on_line(stream, line)
+        :param stop_when: предикат досрочной остановки по строке вывода
+        :param max_lines: хранить только последние max_lines строк каждого потока
+        """
+        stdin, stdout, stderr = self.client.exec_command(command)
+        # stdout и stderr вычитываются до получения кода возврата
+        result = stream_channel(stdout.channel, on_line, stop_when, max_lines)
+        output = result.stdout.strip()
+        error = result.stderr.strip()
+
+        if check and not result.stopped and result.exit_code != 0:
+            raise Exception(f"SSH command failed ({result.exit_code}): {command}\n{error}")
+        return output
+
+    @property
+    def shell(self):
+        """Долгоживущая оболочка для пакетного выполнения команд"""
+        if self._shell is None or self._shell.closed:
+            self._shell = RemoteShell(self.client)
+        return self._shell
+
+    def run_batch(self, commands, check=True, timeout=None):
+        """
+        Выполняет пакет команд в одной оболочке за один обмен с сервером
+        :param timeout: предельное время пакета в секундах (по умолчанию ssh.batch_timeout)
+        """
+        timeout = timeout or config.get('ssh', {}).get('batch_timeout', 300)
+        shell = self.shell
+        try:
+            results = shell.run(list(commands), timeout)
+        except Exception:
+            # Например, незакрытая кавычка: оболочка ждет продолжения, а буферы рассинхронизированы.
+            # Такая оболочка закрывается, следующий пакет откроет новую
+            shell.close()
+            self._shell = None
+            raise
+        if check:
+            for result in results:
+                if result.exit_code != 0:
+                    raise Exception(
+                        f"SSH command failed ({result.exit_code}): {result.command}\n{result.stderr}"
+                    )
+        return results
+
+    def download_file(self, remote_path, local_path, sftp=None, size=None):
+        """
+        Скачивает файл с сервера с упреждающим чтением
+        :param size: размер файла, если уже известен (иначе запрашивается отдельным stat)
+        """
+        sftp = sftp or self.sftp
+        start = time.perf_counter()
+        received = 0
+        with sftp.open(remote_path, 'rb') as remote, open(local_path, 'wb') as local:
+            # prefetch отправляет все запросы чтения сразу, не дожидаясь ответов
+            remote.prefetch(remote.stat().st_size if size is None else size)
+            while True:
+                chunk = remote.read(TRANSFER_CHUNK)
+                if not chunk:
+                    break
+                local.write(chunk)
+                received += len(chunk)
+        return self._report_transfer('download', remote_path, received, start)
+
+    def upload_file(self, local_path, remote_path, sftp=None):
+        """Загружает файл на сервер с конвейерной записью"""
+        sftp = sftp or self.sftp
+        start = time.perf_counter()
+        size = 0
+        with open(local_path, 'rb') as local, sftp.open(remote_path, 'wb') as remote:
+            # Не ждем подтверждения каждого блока, ошибки проверяются при закрытии
+            remote.set_pipelined(True)
+            while True:
+                chunk = local.read(TRANSFER_CHUNK)
+                if not chunk:
+                    break
+                remote.write(chunk)
+                size += len(chunk)
+        return self._report_transfer('upload', remote_path, size, start)
+
+    def _walk_remote(self, remote_path, local_path):
+        """Обход удаленного дерева по атрибутам из listdir_attr; отдельный stat только для символических ссылок"""
+        sftp = self.sftp
+        files = []
+        stack = [(remote_path, local_path)]
+        while stack:
+            remote_dir, local_dir = stack.pop()
+            os.makedirs(local_dir, exist_ok=True)
+            for attr in sftp.listdir_attr(remote_dir):
+                remote_item = f"{remote_dir}/{attr.filename}"
+                local_item = os.path.join(local_dir, attr.filename)
+                if stat.S_ISLNK(attr.st_mode):
+                    # listdir_attr возвращает атрибуты самой ссылки; цель узнаем отдельным stat
+                    attr = sftp.stat(remote_item)
+                if stat.S_ISDIR(attr.st_mode):
+                    stack.append((remote_item, local_item))
+                else:
+                    files.append((remote_item, local_item, attr.st_size or 0))
+        return files
+
+    def download_directory(self, remote_path, local_path, workers=None, max_inflight_mb=None):
+        """Рекурсивное скачивание директории пулом SFTP-каналов"""
+        transfer_config = config.get('transfer', {})
+        workers = workers or transfer_config.get('workers', 4)
+        max_inflight_mb = max_inflight_mb or transfer_config.get('max_inflight_mb', 64)
+
+        files = self._walk_remote(remote_path, local_path)
+        if not files:
+            return []
+
+        budget = _ByteBudget(max_inflight_mb * 1024 * 1024)
+        # Каждый рабочий поток получает свой SFTP-канал на общем транспорте
+        channels = queue.Queue()
+        channel_count = min(workers, len(files))
+        for _ in range(channel_count):
+            channels.put(self.client.open_sftp())
+
+        def fetch(item):
+            remote_item, local_item, size = item
+            budget.acquire(size)
+            sftp = channels.get()
+            try:
+                return self.download_file(remote_item, local_item, sftp=sftp, size=size)
+            finally:
+                channels.put(sftp)
+                budget.release(size)
+
+        try:
+            with ThreadPoolExecutor(max_workers=channel_count) as executor:
+                return list(executor.map(fetch, files))
+        finally:
+            while not channels.empty():
+                channels.get().close()
+
+    def remote_manifest(self, remote_path):
+        """Манифест удаленного дерева одной командой, без скачивания файлов"""
+        return parse_manifest(self.run_ssh_command(manifest_command(remote_path)))
+
+    def transfer_summary(self):
+        """Суммарный объем и средняя скорость всех передач"""
+        total_bytes = sum(t['bytes'] for t in self.transfers)
+        total_time = sum(t['seconds'] for t in self.transfers)
+        speed = total_bytes / (1024 * 1024) / total_time if total_time > 0 else 0
+        return {'count': len(self.transfers), 'bytes': total_bytes,
+                'seconds': total_time, 'mb_per_s': speed}
 
     def close(self):
+        if self._shell is not None:
+            self._shell.close()
+            self._shell = None
+        if self._sftp is not None:
+            self._sftp.close()
+            self._sftp = None
         self.client.close()
 
 
+class RemoteBenchAgent:
+    """Клиент агента замеров, загруженного на сервер"""
+
+    def __init__(self, ssh_client, remote_path, python='python3', interval=0.05):
+        self.ssh_client = ssh_client
+        self.remote_path = remote_path
+        self.python = python
+        # Период опроса /proc/stat на сервере, в секундах
+        self.interval = interval
+
+    def command(self, command, limits=None, series=None):
+        """
+        Строка запуска команды под агентом; ограничения процесса накладывает агент
+        :param series: удаленный файл для ряда замеров CPU (в выводе агента только итоги)
+        """
+        options = f"--interval {self.interval}"
+        if limits:
+            options += f" --limits {shlex.quote(json.dumps(limits))}"
+        if series:
+            options += f" --series {shlex.quote(series)}"
+        return f"{self.python} {self.remote_path} {options} -- {command}"
+
+    @staticmethod
+    def parse(output, command, check=True):
+        """Запись замера из вывода агента"""
+        record = json.loads(output.splitlines()[-1])
+        if check and record['exit_code'] != 0:
+            raise Exception(
+                f"SSH command failed ({record['exit_code']}): {command}\n{record['stderr']}"
+            )
+        return record
+
+    def run(self, command, check=True, limits=None, series=None):
+        """
+        Выполняет команду под агентом и возвращает запись замера
+        :param command: команда в синтаксисе shell сервера
+        :param limits: ограничения процесса (cpus, memory_mb, nice, ionice)
+        :param series: удаленный файл для ряда замеров CPU
+        :return: словарь с wall_s, user_s, sys_s, max_rss_kb, cpu, limits и др.
+        """
+        output = self.ssh_client.run_ssh_command(self.command(command, limits, series))
+        return self.parse(output, command, check)
+
+    def fingerprint(self):
+        """Отпечаток окружения сервера: модель CPU, число ядер, версия ядра и 7z"""
+        output = self.ssh_client.run_ssh_command(f"{self.python} {self.remote_path} --fingerprint")
+        return json.loads(output.splitlines()[-1])
+
+
+class RemoteCorpus:
+    """Клиент генератора тестовых данных, загруженного на сервер"""
+
+    def __init__(self, ssh_client, remote_path, python='python3', cache_dir=None, cache_max_mb=None):
+        self.ssh_client = ssh_client
+        self.remote_path = remote_path
+        self.python = python
+        # Кеш на сервере: файлы с той же спецификацией не генерируются повторно
+        self.cache_dir = cache_dir
+        self.cache_max_mb = cache_max_mb
+
+    def generate(self, files, seed, workers=None, profile='random'):
+        """
+        Генерация файлов на сервере одним вызовом
+        :param files: список (ключ, размер в байтах, удаленный путь)
+        :param profile: профиль сжимаемости данных
+        :return: словарь: files, bytes, seconds, mbps, workers, profile, cached
+        """
+        options = f"--seed {seed} --profile {shlex.quote(profile)}" + (f" --workers {workers}" if workers else "")
+        if self.cache_dir:
+            options += f" --cache-dir {shlex.quote(self.cache_dir)}"
+            if self.cache_max_mb:
+                options += f" --cache-max-mb {self.cache_max_mb}"
+        specs = ' '.join(shlex.quote(f"{key}:{size}:{path}") for key, size, path in files)
+        output = self.ssh_client.run_ssh_command(f"{self.python} {self.remote_path} {options} -- {specs}")
+        return json.loads(output.splitlines()[-1])
+
+
 @pytest.fixture(scope="session")
 def ssh_client():
     client = paramiko.SSHClient()
@@ -88,7 +423,13 @@ def ssh_client():
 
     try:
         client.connect(**connect_params)
-        yield SSHClient(client)
+        wrapper = SSHClient(client)
+        yield wrapper
+        summary = wrapper.transfer_summary()
+        if summary['count']:
+            print(f"\nSFTP: {summary['count']} передач, {summary['bytes']} байт, "
+                  f"{summary['mb_per_s']:.2f} MB/s")
+        wrapper.close()
     except Exception as e:
         pytest.fail(f"SSH connection failed: {str(e)}")
     finally:
@@ -96,23 +437,55 @@ def ssh_client():
 
 
 @pytest.fixture(scope="session")
-def test_environment(ssh_client):
-    """Подготовка тестового окружения на удаленном сервере"""
-    # Устанавливаем sysstat для мониторинга CPU
-    ssh_client.run_ssh_command("command -v mpstat || sudo apt-get install -y sysstat", check=False)
+def remote_executor(ssh_client):
+    """Асинхронный исполнитель удаленных операций с ограниченным параллелизмом"""
+    executor = AsyncRemoteExecutor(
+        ssh_client,
+        max_concurrency=config.get('async', {}).get('max_concurrency', 8)
+    )
+    yield executor
+    executor.close()
+
+
+@pytest.fixture(scope="session")
+def bench_agent(ssh_client):
+    """Загружает агент замеров на сервер один раз за сессию"""
+    agent_config = config.get('agent', {})
+    remote_path = agent_config.get('remote_path', '/tmp/7z_bench_agent.py')
+    ssh_client.upload_file(str(Path(__file__).parent / 'bench_agent.py'), remote_path)
+    interval = config.get('performance', {}).get('cpu_sampling', {}).get('interval_ms', 50) / 1000
+    yield RemoteBenchAgent(ssh_client, remote_path, agent_config.get('python', 'python3'), interval)
+    ssh_client.run_ssh_command(f"rm -f {remote_path}", check=False)
+
+
+@pytest.fixture(scope="session")
+def corpus_generator(ssh_client):
+    """Загружает генератор тестовых данных на сервер один раз за сессию"""
+    agent_config = config.get('agent', {})
+    remote_path = agent_config.get('corpus_path', '/tmp/7z_corpus.py')
+    ssh_client.upload_file(str(Path(__file__).parent / 'corpus.py'), remote_path)
+    cache_config = config.get('performance', {}).get('corpus', {}).get('cache', {})
+    cache_dir = cache_config.get('dir') if cache_config.get('enabled', True) else None
+    yield RemoteCorpus(ssh_client, remote_path, agent_config.get('python', 'python3'),
+                       cache_dir, int(cache_config.get('max_gb', 20) * 1024))
+    ssh_client.run_ssh_command(f"rm -f {remote_path}", check=False)
 
-    # Создаем директории
-    ssh_client.run_ssh_command(f"mkdir -p {TEST_DIR}")
-    ssh_client.run_ssh_command(f"mkdir -p {EXTRACT_DIR}")
-    ssh_client.run_ssh_command(f"mkdir -p {PERF_ARCHIVE_DIR}")
+
+@pytest.fixture(scope="session")
+def test_environment(ssh_client, remote_executor):
+    """Подготовка тестового окружения на удаленном сервере"""
+    # Очищаем остатки прерванных сессий и создаем директории одним пакетом
+    remote_dirs = [TEST_DIR, EXTRACT_DIR, PERF_ARCHIVE_DIR]
+    remote_dirs += sorted({os.path.dirname(f"{TEST_DIR}/{file_info['path']}")
+                           for file_info in config['test_files']})
+    ssh_client.run_batch([f"rm -rf {TEST_DIR}", f"rm -f {ARCHIVE_FILE}"] +
+                         [f"mkdir -p {remote_dir}" for remote_dir in remote_dirs])
 
     # Создаем тестовые файлы
+    tmp_paths = []
+    uploads = []
     for file_info in config['test_files']:
         remote_path = f"{TEST_DIR}/{file_info['path']}"
-        remote_dir = os.path.dirname(remote_path)
-
-        # Создаем директорию, если нужно
-        ssh_client.run_ssh_command(f"mkdir -p {remote_dir}", check=False)
 
         # Подготовка содержимого файла
         content = file_info['content']
@@ -128,35 +501,49 @@ def test_environment(ssh_client):
         # Создаем временный файл
         with tempfile.NamedTemporaryFile(delete=False) as tmp:
             tmp.write(content)
-            tmp_path = tmp.name
+            tmp_paths.append(tmp.name)
 
-        # Копируем файл на сервер
-        ssh_client.upload_file(tmp_path, remote_path)
+        uploads.append(remote_executor.upload(tmp.name, remote_path))
 
-        # Удаляем временный файл
-        os.unlink(tmp_path)
+    # Копируем файлы на сервер параллельно
+    try:
+        remote_executor.run_tasks(*uploads)
+    finally:
+        for tmp_path in tmp_paths:
+            os.unlink(tmp_path)
 
-    # Создаем архив для тестов
+    # Создаем архив для тестов; эталонный архив для тех же файлов берется из кеша на сервере
     archive_type = config.get('archive', {}).get('type', '7z')
-    ssh_client.run_ssh_command(
-        f"7z a -t{archive_type} {ARCHIVE_FILE} {TEST_DIR}/*"
-    )
+    create_archive = f"7z a -t{archive_type} {ARCHIVE_FILE} {TEST_DIR}/*"
+    cache_config = config.get('performance', {}).get('corpus', {}).get('cache', {})
+    if cache_config.get('enabled', True) and cache_config.get('dir'):
+        # Ключ строится по фактическому дереву на сервере: пути и SHA-256 файлов
+        manifest = sorted(ssh_client.remote_manifest(TEST_DIR).items())
+        cached = (f"{cache_config['dir']}/"
+                  f"{CorpusCache.digest('archive', archive_type, TEST_DIR.name, manifest)}.{archive_type}")
+        create_archive = (f"if [ -f '{cached}' ]; then cp '{cached}' {ARCHIVE_FILE} && touch '{cached}'; "
+                          f"else {create_archive} && mkdir -p '{cache_config['dir']}' && "
+                          f"cp {ARCHIVE_FILE} '{cached}.tmp$$' && mv '{cached}.tmp$$' '{cached}'; fi")
+    ssh_client.run_ssh_command(create_archive)
 
     yield
 
     # Очистка после тестов
-    ssh_client.run_ssh_command(f"rm -rf {TEST_DIR}/*", check=False)
-    ssh_client.run_ssh_command(f"rm -rf {EXTRACT_DIR}/*", check=False)
-    ssh_client.run_ssh_command(f"rm -rf {PERF_ARCHIVE_DIR}/*", check=False)
-    ssh_client.run_ssh_command(f"rm -f {ARCHIVE_FILE}", check=False)
+    ssh_client.run_batch([
+        f"rm -rf {TEST_DIR}/*",
+        f"rm -rf {EXTRACT_DIR}/*",
+        f"rm -rf {PERF_ARCHIVE_DIR}/*",
+        f"rm -f {ARCHIVE_FILE}"
+    ], check=False)
 
 
 @pytest.fixture
-def make_files(ssh_client):
+def make_files(corpus_generator):
     """Фикстура для создания тестовых файлов производительности"""
+    corpus_config = config.get('performance', {}).get('corpus', {})
 
-    def _make_files(file_sizes, prefix="test"):
-        files = []
+    def _make_files(file_sizes, prefix="test", profile="random"):
+        specs = []
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
 
         # Очищаем имя префикса от пробелов и спецсимволов
@@ -170,46 +557,34 @@ def make_files(ssh_client):
             else:
                 size_bytes = size
 
-            # Создаем файл
+            # Ключ без метки времени: содержимое одинаково между запусками
             filename = f"{safe_prefix}_{timestamp}_{i}.dat"
-            remote_path = f"{TEST_DIR}/{filename}"
+            specs.append((f"{safe_prefix}_{i}", size_bytes, f"{TEST_DIR}/{filename}"))
 
-            # Экранируем путь и создаем файл нужного размера
-            ssh_client.run_ssh_command(
-                f"dd if=/dev/urandom of='{remote_path}' bs=1024 count={size_bytes // 1024}"
-            )
-
-            files.append(remote_path)
-
-        return files
+        # Все файлы генерируются на сервере одним вызовом
+        report = corpus_generator.generate(specs, corpus_config.get('seed', 1337),
+                                           corpus_config.get('workers'), profile)
+        print(f"\nСгенерировано {report['files'] - report['cached']} файлов ({profile}), "
+              f"{report['bytes'] / 1024 / 1024:.1f} MB за {report['seconds']:.2f} сек ({report['mbps']:.1f} MB/s), "
+              f"из кеша {report['cached']}")
+        return [path for _, _, path in specs]
 
     return _make_files
 
 
-@pytest.fixture(scope="session", autouse=True)
-def init_csv_report():
-    """Инициализация CSV-файла для результатов производительности"""
-    PERF_RESULTS = Path("performance_results.csv")
-
-    if PERF_RESULTS.exists():
-        backup_name = f"performance_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        PERF_RESULTS.rename(backup_name)
-
-    with open(PERF_RESULTS, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "Test Case",
-            "Operation",
-            "Total Size (MB)",
-            "File Count",
-            "Start Time",
-            "End Time",
-            "Duration (s)",
-            "Speed (MB/s)",
-            "Max CPU (%)"  # Новая колонка
-        ])
-
-    # Создаем директорию для логов CPU
-    os.makedirs("cpu_logs", exist_ok=True)
-
-    return PERF_RESULTS
\ No newline at end of file
+@pytest.fixture(scope="session")
+def results_store(bench_agent):
+    """Хранилище результатов: один запуск на сессию с отпечатком окружения сервера"""
+    store = ResultsStore(config.get('performance', {}).get('results_db', '../data/performance_results.db'))
+    store.start_run(bench_agent.fingerprint(), suite='sem_4')
+    yield store
+    # CSV текущего запуска остается для совместимости со старыми отчетами
+    store.export_csv("performance_results.csv")
+    store.close()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Регрессия производительности проваливает сессию, если это задано в конфиге"""
+    regressions = getattr(session, 'perf_regressions', None)
+    if regressions and config.get('performance', {}).get('baseline', {}).get('fail_session', True):
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# Генератор тестовых данных с фиксированным зерном.
+#
+# Каждый блок файла строится из собственного зерна, выведенного из общего зерна,
+# ключа файла и номера блока, поэтому корпус побайтно совпадает между запусками,
+# а блоки одного файла пишутся параллельно по смещениям.
+# Профиль задает сжимаемость данных: random, zeros, entropy:<бит на байт>,
+# text, log или dup:<число уникальных фрагментов>.
+# Использует только стандартную библиотеку: тот же модуль запускается на сервере.
+#
+# С кешем (--cache-dir) файлы берутся из каталога, где они лежат под хешем
+# спецификации (зерно, ключ, размер, профиль); старые записи вытесняются по LRU.
+#
+# Запуск: python3 corpus.py --seed 1337 [--workers 4] [--profile text]
+#         [--cache-dir DIR --cache-max-mb N] -- key:size:path [key:size:path ...]
+# Вывод: одна строка JSON с объемом и скоростью генерации.
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BLOCK_SIZE = 1024 * 1024
+# Блоков в одном задании пула: крупные файлы делятся на части
+BLOCKS_PER_JOB = 8
+
+
+def block_seed(seed, key, block):
+    digest = hashlib.sha256(f"{seed}:{key}:{block}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def _random_bytes(rng, length):
+    # То же, что Random.randbytes, но доступно и в старых версиях Python
+    return rng.getrandbits(length * 8).to_bytes(length, 'little')
+
+
+def _make_vocabulary(size=2000):
+    rng = random.Random(0)
+    syllables = ['ar', 'be', 'ci', 'do', 'en', 'fa', 'ge', 'hi', 'in', 'ko', 'la', 'me', 'no',
+                 'or', 'pa', 're', 'si', 'ta', 'un', 've', 'wi', 'xo', 'ya', 'ze', 'st', 'th']
+    words = ['the', 'of', 'and', 'to', 'in', 'is', 'for', 'on', 'with', 'as']
+    while len(words) < size:
+        words.append(''.join(rng.choice(syllables) for _ in range(rng.randint(1, 4))))
+    return words
+
+
+# Частоты слов по закону Ципфа, как в естественном тексте
+VOCABULARY = _make_vocabulary()
+VOCABULARY_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+LOG_LEVELS = ['DEBUG', 'INFO', 'INFO', 'INFO', 'INFO', 'WARN', 'ERROR']
+LOG_COMPONENTS = ['http', 'db', 'auth', 'cache', 'scheduler', 'worker', 'storage']
+LOG_MESSAGES = ['request completed', 'connection opened', 'connection closed', 'cache miss',
+                'cache hit', 'retrying operation', 'query executed', 'session expired',
+                'job scheduled', 'upload finished']
+DUP_CHUNK = 4096
+
+
+def _text(rng, length):
+    parts = []
+    produced = 0
+    while produced < length:
+        line = ' '.join(rng.choices(VOCABULARY, cum_weights=VOCABULARY_WEIGHTS, k=12)) + '.\n'
+        parts.append(line)
+        produced += len(line)
+    return ''.join(parts).encode('ascii')[:length]
+
+
+def _log(rng, length, block):
+    parts = []
+    produced = 0
+    # Время в блоке растет монотонно, как в настоящем журнале
+    timestamp = 1700000000.0 + block * 3600
+    while produced < length:
+        timestamp += rng.random() * 0.05
+        seconds = int(timestamp)
+        line = (f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}."
+                f"{int((timestamp - seconds) * 1000):03d}Z {rng.choice(LOG_LEVELS):<5} "
+                f"[{rng.choice(LOG_COMPONENTS)}] {rng.choice(LOG_MESSAGES)} "
+                f"request_id={rng.getrandbits(32):08x} duration_ms={rng.randint(1, 500)}\n")
+        parts.append(line)
+        produced += len(line)
+    return ''.join(parts).encode('ascii')[:length]
+
+
+def _dup(rng, length, param, pool_rng):
+    # Блоки собираются из общего для файла набора фрагментов
+    pool = [_random_bytes(pool_rng, DUP_CHUNK) for _ in range(int(param or 64))]
+    return b''.join(rng.choices(pool, k=-(-length // DUP_CHUNK)))[:length]
+
+
+PROFILES = ('random', 'zeros', 'entropy', 'text', 'log', 'dup')
+
+
+def parse_profile(profile):
+    """Разбор профиля вида 'имя' или 'имя:параметр'"""
+    name, _, param = (profile or 'random').partition(':')
+    if name not in PROFILES:
+        raise ValueError(f"Неизвестный профиль данных: {profile}")
+    return name, param
+
+
+def block_data(seed, key, block, length, profile='random'):
+    """Содержимое блока файла в заданном профиле"""
+    name, param = parse_profile(profile)
+    rng = random.Random(block_seed(seed, key, block))
+    if name == 'zeros':
+        return bytes(length)
+    if name == 'entropy':
+        # Младшие биты равномерных байтов: ровно столько бит энтропии на байт
+        mask = (1 << int(param or 4)) - 1
+        return _random_bytes(rng, length).translate(bytes(b & mask for b in range(256)))
+    if name == 'text':
+        return _text(rng, length)
+    if name == 'log':
+        return _log(rng, length, block)
+    if name == 'dup':
+        return _dup(rng, length, param, random.Random(block_seed(seed, key, 'pool')))
+    return _random_bytes(rng, length)
+
+
+def _write_blocks(job):
+    path, seed, key, first, last, size, profile = job
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        for block in range(first, last):
+            offset = block * BLOCK_SIZE
+            os.pwrite(fd, block_data(seed, key, block, min(BLOCK_SIZE, size - offset), profile), offset)
+    finally:
+        os.close(fd)
+    return min(last * BLOCK_SIZE, size) - first * BLOCK_SIZE
+
+
+class CorpusCache:
+    """Каталог сгенерированных файлов и эталонных архивов, адресуемых хешем спецификации"""
+
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def digest(*parts):
+        data = json.dumps(parts, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(data).hexdigest()[:24]
+
+    def path(self, digest, suffix='.dat'):
+        return os.path.join(self.root, digest + suffix)
+
+    def staging_path(self, digest, suffix='.dat'):
+        return f"{self.path(digest, suffix)}.tmp{os.getpid()}"
+
+    def lookup(self, digest, suffix='.dat'):
+        """Путь к записи или None; найденная запись становится самой свежей для LRU"""
+        path = self.path(digest, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def commit(self, staging, digest, suffix='.dat'):
+        # Запись появляется атомарно: прерванная генерация не оставит неполный файл
+        os.replace(staging, self.path(digest, suffix))
+
+    def add(self, source, digest, suffix='.dat'):
+        """Копирует готовый файл (например, эталонный архив) в кеш"""
+        staging = self.staging_path(digest, suffix)
+        shutil.copyfile(source, staging)
+        self.commit(staging, digest, suffix)
+        self.evict(keep={self.path(digest, suffix)})
+
+    @staticmethod
+    def materialize(cached, target, copy=False):
+        """Размещает файл из кеша по целевому пути: жесткой ссылкой, если можно, иначе копией"""
+        if os.path.lexists(target):
+            os.unlink(target)
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        if not copy:
+            try:
+                os.link(cached, target)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(cached, target)
+
+    def evict(self, keep=()):
+        """Удаляет давно не использованные записи, пока кеш больше лимита"""
+        if not self.max_bytes:
+            return
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and '.tmp' not in entry.name:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path not in keep:
+                os.unlink(path)
+                total -= size
+
+
+def generate_corpus(files, seed, workers=None, profile='random', cache=None):
+    """
+    Генерация набора файлов
+    :param files: список (ключ, размер в байтах, путь); содержимое зависит только от зерна и ключа
+    :param workers: число процессов, по умолчанию по числу CPU
+    :param profile: профиль сжимаемости данных
+    :param cache: CorpusCache; файлы из кеша не генерируются повторно
+    :return: словарь: files, bytes, seconds, mbps, workers, profile, cached
+    """
+    parse_profile(profile)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    # С кешем генерируются только отсутствующие в нем файлы, сразу в каталог кеша
+    pending = []
+    staged = {}
+    cached = {}
+    for key, size, path in files:
+        if cache is None:
+            pending.append((key, size, str(path)))
+            continue
+        digest = cache.digest(seed, key, size, profile)
+        cached[str(path)] = digest
+        if digest not in staged and cache.lookup(digest) is None:
+            staged[digest] = cache.staging_path(digest)
+            pending.append((key, size, staged[digest]))
+
+    jobs = []
+    for key, size, path in pending:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Файл сразу получает итоговый размер, блоки дописываются по смещениям
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        blocks = -(-size // BLOCK_SIZE)
+        for first in range(0, blocks, BLOCKS_PER_JOB):
+            jobs.append((path, seed, key, first, min(first + BLOCKS_PER_JOB, blocks), size, profile))
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            written = sum(pool.map(_write_blocks, jobs))
+    else:
+        written = sum(map(_write_blocks, jobs))
+
+    if cache is not None:
+        for digest, staging in staged.items():
+            cache.commit(staging, digest)
+        for path, digest in cached.items():
+            cache.materialize(cache.path(digest), path)
+        cache.evict(keep={cache.path(digest) for digest in cached.values()})
+
+    seconds = time.perf_counter() - start
+    return {
+        'files': len(files),
+        'bytes': written,
+        'seconds': seconds,
+        'mbps': written / 1024 / 1024 / seconds if seconds > 0 else 0.0,
+        'workers': workers,
+        'profile': profile,
+        'cached': len(files) - len(pending)
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Генерация тестового корпуса")
+    parser.add_argument('--seed', type=int, required=True)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--profile', default='random', help="random, zeros, entropy:N, text, log, dup:N")
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--cache-max-mb', type=int, default=None)
+    parser.add_argument('files', nargs='+', help="key:size:path")
+    args = parser.parse_args(argv)
+    cache = None
+    if args.cache_dir:
+        cache = CorpusCache(args.cache_dir, args.cache_max_mb and args.cache_max_mb * 1024 * 1024)
+
+    files = []
+    for spec in args.files:
+        key, size, path = spec.split(':', 2)
+        files.append((key, int(size), path))
+    print(json.dumps(generate_corpus(files, args.seed, args.workers, args.profile, cache)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,34 +1,270 @@
+import select
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
 import paramiko
 
 
-def ssh_checkout(host, user, passwd, cmd, text, port=22):
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    client.connect(hostname=host, username=user, password=passwd, port=port)
-    stdin, stdout, stderr = client.exec_command(cmd)
-    exit_code = stdout.channel.recv_exit_status()
-    out = (stdout.read() + stderr.read()).decode("utf-8")
-    client.close()
-    if text in out and exit_code == 0:
+class SSHConnectionPool:
+    """Пул SSH-соединений с ключом (host, port, user)"""
+
+    def __init__(self, idle_timeout=300, keepalive=30):
+        # idle_timeout - через сколько секунд простоя соединение закрывается
+        # keepalive - интервал keepalive-пакетов транспорта (0 - отключено)
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        # Текущее соединение по ключу и все выданные соединения, включая выведенные из пула
+        self._connections = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, host, user, passwd, port):
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(hostname=host, username=user, password=passwd, port=port)
+        if self.keepalive:
+            client.get_transport().set_keepalive(self.keepalive)
+        return client
+
+    @staticmethod
+    def _is_alive(client):
+        """Проверка живости соединения без выполнения команды"""
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            # ignore-пакет не требует ответа, но падает на разорванном сокете
+            transport.send_ignore()
+        except Exception:
+            return False
+        return True
+
+    def _retire(self, entry):
+        """
+        Выводит соединение из пула; закрывается оно, когда его вернет последний пользователь
+        :return: клиент, который можно закрыть сейчас, или None
+        """
+        entry['dead'] = True
+        if entry['users']:
+            return None
+        self._entries.pop(entry['client'], None)
+        return entry['client']
+
+    def _evict_idle(self, now):
+        # Занятые соединения не закрываются, сколько бы ни шла команда
+        idle = []
+        for key, entry in list(self._connections.items()):
+            if not entry['users'] and now - entry['last_used'] > self.idle_timeout:
+                del self._connections[key]
+                idle.append(self._retire(entry))
+        return idle
+
+    def _checkout(self, entry):
+        entry['users'] += 1
+        entry['last_used'] = time.monotonic()
+        return entry['client']
+
+    def get(self, host, user, passwd, port=22):
+        """
+        Возвращает живое соединение из пула, переподключаясь при необходимости
+        Соединение считается занятым до вызова release
+        """
+        key = (host, port, user)
+        with self._lock:
+            stale = self._evict_idle(time.monotonic())
+            entry = self._connections.get(key)
+            client = self._checkout(entry) if entry is not None and self._is_alive(entry['client']) else None
+        self._close(stale)
+        if client is not None:
+            return client
+
+        # Подключение идет вне блокировки: соединения с разными серверами не ждут друг друга
+        client = self._connect(host, user, passwd, port)
+        with self._lock:
+            entry = self._connections.get(key)
+            if entry is not None and self._is_alive(entry['client']):
+                # Другой поток успел подключиться раньше
+                stale = [client]
+                client = self._checkout(entry)
+            else:
+                stale = [self._retire(entry)] if entry is not None else []
+                entry = {'client': client, 'users': 0, 'dead': False}
+                self._connections[key] = self._entries[client] = entry
+                self._checkout(entry)
+        self._close(stale)
+        return client
+
+    def release(self, client):
+        """Возвращает соединение в пул; отсчет простоя начинается с этого момента"""
+        with self._lock:
+            entry = self._entries.get(client)
+            if entry is None:
+                return
+            entry['users'] -= 1
+            entry['last_used'] = time.monotonic()
+            stale = [self._retire(entry)] if entry['dead'] else []
+        self._close(stale)
+
+    @contextmanager
+    def connection(self, host, user, passwd, port=22):
+        client = self.get(host, user, passwd, port)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def discard(self, host, user, port=22):
+        """Выводит соединение из пула; команды, уже идущие через него, доработают"""
+        with self._lock:
+            entry = self._connections.pop((host, port, user), None)
+            stale = [self._retire(entry)] if entry is not None else []
+        self._close(stale)
+
+    @staticmethod
+    def _close(clients):
+        for client in clients:
+            if client is not None:
+                client.close()
+
+    def close_all(self):
+        with self._lock:
+            clients = list(self._entries)
+            self._connections.clear()
+            self._entries.clear()
+        self._close(clients)
+
+
+# Общий пул для всех проверок модуля
+pool = SSHConnectionPool()
+
+
+# Попытки открыть канал, когда сервер отказывает по лимиту сессий (MaxSessions)
+CHANNEL_RETRIES = 5
+
+
+@contextmanager
+def _exec(host, user, passwd, cmd, port):
+    """
+    Выполняет команду через соединение из пула, повторяя попытку после обрыва
+    Соединение остается занятым, пока вызывающий код читает вывод внутри with
+    """
+    failures = 0
+    for attempt in range(CHANNEL_RETRIES):
+        with pool.connection(host, user, passwd, port) as client:
+            try:
+                streams = client.exec_command(cmd)
+            except paramiko.ChannelException:
+                # Транспорт жив, сервер не дал новый канал: ждем освобождения, соединение не трогаем
+                if attempt == CHANNEL_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+                continue
+            except (paramiko.SSHException, EOFError, OSError):
+                # Соединение умерло между проверкой и открытием канала
+                pool.discard(host, user, port)
+                failures += 1
+                if failures > 1:
+                    raise
+                continue
+            yield streams
+            return
+    raise paramiko.SSHException(f"Не удалось открыть канал для команды: {cmd}")
+
+
+StreamResult = namedtuple('StreamResult', ['exit_code', 'stdout', 'stderr', 'stopped'])
+
+# Строка без перевода строки длиннее этого размера выдается частями
+MAX_LINE_BYTES = 64 * 1024
+
+
+def stream_channel(channel, on_line=None, stop_when=None, max_lines=None):
+    """
+    Построчное чтение stdout и stderr канала одновременно
+    :param on_line: вызывается как on_line(stream, line) для каждой строки
+    :param stop_when: предикат по строке; при True канал закрывается досрочно
+    :param max_lines: размер кольцевого буфера строк на поток (None - без ограничения)
+    :return: StreamResult; exit_code равен None при досрочной остановке
+    """
+    buffers = {'stdout': deque(maxlen=max_lines), 'stderr': deque(maxlen=max_lines)}
+    partial = {'stdout': b'', 'stderr': b''}
+
+    def emit(name, raw):
+        line = raw.decode('utf-8', errors='replace').rstrip('\r')
+        buffers[name].append(line)
+        if on_line is not None:
+            on_line(name, line)
+        return stop_when is not None and stop_when(line)
+
+    def feed(name, data):
+        lines = (partial[name] + data).split(b'\n')
+        partial[name] = lines.pop()
+        # Длинная строка режется только при ограниченном буфере или построчной обработке;
+        # иначе вывод хранится целиком и строка (например, запись JSON) должна остаться цельной
+        if len(partial[name]) > MAX_LINE_BYTES and (on_line is not None or max_lines is not None):
+            lines.append(partial[name])
+            partial[name] = b''
+        return any(emit(name, raw) for raw in lines)
+
+    stopped = False
+    while not stopped:
+        # Оба потока вычитываются по мере поступления, чтобы не переполнить окно канала
+        if channel.recv_ready():
+            stopped = feed('stdout', channel.recv(65536))
+        elif channel.recv_stderr_ready():
+            stopped = feed('stderr', channel.recv_stderr(65536))
+        elif channel.eof_received or channel.closed:
+            break
+        else:
+            select.select([channel], [], [], 0.1)
+
+    if stopped:
+        channel.close()
+        exit_code = None
+    else:
+        for name in partial:
+            if partial[name] and emit(name, partial[name]):
+                stopped = True
+        exit_code = channel.recv_exit_status()
+
+    return StreamResult(exit_code, "\n".join(buffers['stdout']),
+                        "\n".join(buffers['stderr']), stopped)
+
+
+def ssh_checkout(host, user, passwd, cmd, text, port=22, early_exit=False, max_lines=1000):
+    # early_exit - вернуть True, как только текст встретился, не дожидаясь конца команды
+    found = False
+
+    def match(line):
+        nonlocal found
+        if text in line:
+            # Достаточно факта совпадения, строки не копятся
+            found = True
+            return early_exit
+        return False
+
+    with _exec(host, user, passwd, cmd, port) as (stdin, stdout, stderr):
+        result = stream_channel(stdout.channel, stop_when=match, max_lines=max_lines)
+    if result.stopped:
+        return True
+    out = "\n".join(filter(None, [result.stdout, result.stderr]))
+    if (found or text in out) and result.exit_code == 0:
         return True
     else:
         return False
 
-def ssh_getout(host, user, passwd, cmd, port=22):
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    client.connect(hostname=host, username=user, password=passwd, port=port)
-    stdin, stdout, stderr = client.exec_command(cmd)
-    out = (stdout.read() + stderr.read()).decode("utf-8")
-    client.close()
+def ssh_getout(host, user, passwd, cmd, port=22, max_lines=None, on_line=None):
+    # max_lines - хранить только последние строки вывода
+    with _exec(host, user, passwd, cmd, port) as (stdin, stdout, stderr):
+        result = stream_channel(stdout.channel, on_line=on_line, max_lines=max_lines)
+    out = "\n".join(filter(None, [result.stdout, result.stderr]))
     return out
 
 def upload_files(host, user, passwd, local_path, remote_path, port=22):
-    transport = paramiko.Transport((host, port))
-    transport.connect(None, username=user, password=passwd)
-    sftp = paramiko.SFTPClient.from_transport(transport)
-    sftp.put(local_path, remote_path)
-    if sftp:
-        sftp.close()
-    if transport:
-        transport.close()
\ No newline at end of file
+    with pool.connection(host, user, passwd, port) as client:
+        sftp = client.open_sftp()
+        try:
+            sftp.put(local_path, remote_path)
+        finally:
+            sftp.close()
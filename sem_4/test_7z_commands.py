@@ -1,12 +1,15 @@
 import pytest
-import time
 import os
 import binascii
 import tempfile
-import csv
+import json
 import re
 from pathlib import Path
 from datetime import datetime
+from checkers import (build_expected_manifest, compare_manifest, verify_file_in_listing,
+                      SltListingParser, check_listing)
+from stats import run_trials, summarize, contention_curve
+from regression import run_gate
 from conftest import config, TEST_DIR, EXTRACT_DIR, PERF_ARCHIVE_DIR, ARCHIVE_FILE
 
 
@@ -55,14 +58,49 @@ def test_archive_listing(test_environment, ssh_client):
     """Тест команды просмотра содержимого архива (l) через SSH"""
     archive_type = config.get('archive', {}).get('type', '7z')
 
-    # Выполняем команду просмотра архива
-    command = f"7z l -t{archive_type} {ARCHIVE_FILE}"
-    result = ssh_client.run_ssh_command(command)
+    # Машиночитаемый листинг разбирается по мере поступления строк, вывод целиком не хранится
+    listing = {}
+    parser = SltListingParser(lambda entry: listing.__setitem__(entry.path, entry))
+    ssh_client.run_ssh_command(
+        f"7z l -slt -t{archive_type} {ARCHIVE_FILE}",
+        on_line=lambda stream, line: stream == 'stdout' and parser.feed(line),
+        max_lines=100
+    )
+    parser.finish()
 
-    # Проверяем наличие файлов в выводе
-    for file_info in config['test_files']:
-        assert file_info['path'] in result, f"File {file_info['path']} not found in archive listing"
+    # Проверяем наличие файлов по точному пути
+    expected = [file_info['path'] for file_info in config['test_files']]
+    for path in expected:
+        assert verify_file_in_listing(listing, path), f"File {path} not found in archive listing"
 
+    status, message = check_listing(listing.values(), expected)
+    assert status, message
+
+
+# Фрагмент вывода 7z l -slt: заголовок архива и две записи
+SLT_SAMPLE = """Path = archive.7z
+Type = 7z
+
+----------
+Path = file1.txt.bak
+Size = 10
+Attributes = A
+
+Path = subdir/file1.txt.bak
+Size = 12
+Attributes = A
+"""
+
+
+def test_listing_exact_path():
+    """Проверка листинга по точному пути: file1.txt не совпадает с file1.txt.bak"""
+    assert verify_file_in_listing(SLT_SAMPLE, "subdir/file1.txt.bak")
+    assert not verify_file_in_listing(SLT_SAMPLE, "file1.txt")
+    assert not verify_file_in_listing(SLT_SAMPLE, "subdir/file1.txt")
+
+    # Обычный вывод 7z l не разбирается молча, а отвергается
+    with pytest.raises(ValueError):
+        verify_file_in_listing("2024-05-01 10:11:12 ....A  10  10  subdir/file1.txt.bak", "file1.txt")
 
 def test_archive_extraction(test_environment, ssh_client):
     """Тест команды извлечения файлов (x) через SSH"""
@@ -77,6 +115,16 @@ def test_archive_extraction(test_environment, ssh_client):
     command = f"7z x -t{archive_type} '{ARCHIVE_FILE}' -o'{remote_extract_dir}' -y"
     ssh_client.run_ssh_command(command)
 
+    verify_mode = config.get('verify', {}).get('mode', 'manifest')
+
+    if verify_mode == 'manifest':
+        # Сверяем размеры и SHA-256 на сервере, не скачивая дерево
+        actual = ssh_client.remote_manifest(remote_extract_dir)
+        expected = build_expected_manifest(config['test_files'])
+        status, message = compare_manifest(actual, expected)
+        assert status, message
+        return
+
     # Создаем временную локальную директорию для скачивания
     with tempfile.TemporaryDirectory() as temp_dir:
         local_extract_dir = Path(temp_dir) / f"remote_extract_{timestamp}"
@@ -91,14 +139,14 @@ def test_archive_extraction(test_environment, ssh_client):
             assert local_file.exists(), f"File {file_info['path']} not extracted"
 
 
-def test_hash_calculation(test_environment, ssh_client):
+def test_hash_calculation(test_environment, remote_executor):
     """Тест расчета хеш-сумм файлов через SSH"""
-    for file_info in config['test_files']:
-        test_file = f"{TEST_DIR}/{file_info['path']}"
+    # Хеши всех файлов считаются на сервере параллельно
+    commands = [f"7z h -scrcCRC32 '{TEST_DIR}/{file_info['path']}'" for file_info in config['test_files']]
+    results = remote_executor.run_all(commands)
 
-        # Экранируем путь к файлу
-        command = f"7z h -scrcCRC32 '{test_file}'"
-        result = ssh_client.run_ssh_command(command)
+    for file_info, result in zip(config['test_files'], results):
+        test_file = f"{TEST_DIR}/{file_info['path']}"
 
         # Подготовка содержимого для проверки
         content = None
@@ -159,170 +207,229 @@ def test_temp_file_hash(ssh_client):
     ssh_client.run_ssh_command(f"rm -rf '{remote_temp_dir}'", check=False)
 
 
-# Функции для мониторинга CPU
-def start_cpu_monitor(ssh_client, duration):
-    """Запускает мониторинг CPU и возвращает имя файла с логами"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    log_file = f"/tmp/cpu_log_{timestamp}.txt"
-    # Запускаем mpstat в фоновом режиме
-    ssh_client.run_ssh_command(f"mpstat 1 {duration} > {log_file} &")
-    return log_file
+def save_cpu_log(test_name, operation, record):
+    """Сохраняет ряд загрузки CPU из записи агента в cpu_logs"""
+    log_file = Path("cpu_logs") / f"{test_name}_{operation}.json"
+    log_file.parent.mkdir(exist_ok=True)
+    log_file.write_text(json.dumps(record['cpu']))
+    return record['cpu']
 
 
-def parse_max_cpu(ssh_client, log_file):
-    """Анализирует лог CPU и возвращает максимальную загрузку"""
-    # Скачиваем лог-файл
-    local_log = f"cpu_logs/{os.path.basename(log_file)}"
-    os.makedirs(os.path.dirname(local_log), exist_ok=True)
-    ssh_client.download_file(log_file, local_log)
+# Получаем тест-кейсы производительности
+test_cases = config['performance']['test_cases']
 
-    max_cpu = 0
-    try:
-        with open(local_log, 'r') as f:
-            for line in f:
-                if 'all' in line:
-                    # Ищем строки вида: "04:25:07 PM  all    5.00    0.00    1.00    0.00    0.00    0.00    0.00    0.00   94.00"
-                    parts = line.split()
-                    if len(parts) >= 12:
-                        # Последнее значение - %idle
-                        idle = float(parts[-1])
-                        usage = 100.0 - idle
-                        if usage > max_cpu:
-                            max_cpu = usage
-    except Exception as e:
-        print(f"Ошибка при анализе лога CPU: {str(e)}")
-
-    # Удаляем лог на сервере
-    ssh_client.run_ssh_command(f"rm -f {log_file}", check=False)
-    return round(max_cpu, 1)
 
+# Параметры повторных прогонов
+TRIALS = config['performance'].get('trials', {})
 
-# Получаем тест-кейсы производительности
-test_cases = config['performance']['test_cases']
+
+def write_result_row(store, test_case, operation, record, cpu, trial, **metrics):
+    """Записывает результат одного прогона в хранилище"""
+    store.record(
+        test_case['name'], operation, test_case['total_size'], test_case['file_count'],
+        datetime.fromtimestamp(record['start_time']).isoformat(),
+        datetime.fromtimestamp(record['end_time']).isoformat(),
+        record['wall_s'], trial,
+        max_cpu=cpu['peak'],
+        mean_cpu=cpu['mean'],
+        cpu_time_s=round(record['user_s'] + record['sys_s'], 3),
+        max_rss_mb=round(record['max_rss_kb'] / 1024, 1),
+        limits=record.get('limits', 'none'),
+        **metrics
+    )
+
+
+# Параметры проверки регрессий
+BASELINE = config['performance'].get('baseline', {})
+
+
+@pytest.fixture(scope="session")
+def regression_gate(request, results_store):
+    """Сравнивает пропускную способность сессии с сохраненной базовой линией"""
+    yield
+    if not BASELINE.get('enabled', True):
+        return
+    regressions = run_gate(results_store.samples('speed_mbps'), results_store.fingerprint, BASELINE)
+    for entry in regressions:
+        print(f"РЕГРЕССИЯ: {entry['test_case']} / {entry['operation']}: {entry['change']:+.1%}")
+    # Решение о провале сессии принимает pytest_sessionfinish в conftest
+    request.session.perf_regressions = regressions
+
+
+# Ограничения процесса 7z по умолчанию; тест-кейс переопределяет их ключом limits
+LIMITS = config['performance'].get('limits', {})
+
+
+def case_limits(test_case):
+    limits = {key: value for key, value in dict(LIMITS, **test_case.get('limits', {})).items() if value is not None}
+    return limits or None
 
 
 @pytest.mark.parametrize("test_case", test_cases, ids=lambda tc: tc['name'])
-def test_file_performance(make_files, test_case, ssh_client):
+def test_file_performance(make_files, test_case, ssh_client, remote_executor, bench_agent,
+                          results_store, regression_gate, final_report):
     """Параметризованный тест производительности через SSH"""
-    # Проверяем доступность mpstat
-    try:
-        ssh_client.run_ssh_command("which mpstat")
-        cpu_monitoring = True
-    except:
-        cpu_monitoring = False
-        print("Утилита mpstat не установлена, мониторинг CPU отключен")
-
-    files = make_files(test_case['file_sizes'], prefix=test_case['name'])
-
-    # Мониторинг CPU для архивации
-    cpu_log_archive = None
-    if cpu_monitoring:
-        # Предполагаемое время выполнения = размер * 2 секунды
-        duration = max(10, test_case['total_size'] * 2)
-        cpu_log_archive = start_cpu_monitor(ssh_client, duration)
-
-    # Тестирование архивации
+    profile = test_case.get('profile', 'random')
+    files = make_files(test_case['file_sizes'], prefix=test_case['name'], profile=profile)
+
     archive_file = f"{PERF_ARCHIVE_DIR}/archive_{test_case['name']}_{datetime.now().strftime('%Y%m%d%H%M%S')}.7z"
-    start_time = time.time()
-    file_list = " ".join([f"'{f}'" for f in files])
-    ssh_client.run_ssh_command(f"7z a -t7z '{archive_file}' {file_list}")
-    end_time = time.time()
-
-    # Получаем данные о CPU для архивации
-    max_cpu_archive = 'N/A'
-    if cpu_monitoring and cpu_log_archive:
-        max_cpu_archive = parse_max_cpu(ssh_client, cpu_log_archive)
-
-    duration = end_time - start_time
-    speed = test_case['total_size'] / duration if duration > 0 else 0
-
-    # Запись результатов в CSV
-    with open("performance_results.csv", "a", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            test_case['name'],
-            "Archive",
-            test_case['total_size'],
-            test_case['file_count'],
-            datetime.fromtimestamp(start_time).isoformat(),
-            datetime.fromtimestamp(end_time).isoformat(),
-            f"{duration:.2f}",
-            f"{speed:.2f}",
-            max_cpu_archive
-        ])
-
-    # Мониторинг CPU для распаковки
-    cpu_log_extract = None
-    if cpu_monitoring:
-        # Предполагаемое время выполнения = размер * 1 секунда
-        duration = max(10, test_case['total_size'])
-        cpu_log_extract = start_cpu_monitor(ssh_client, duration)
-
-    # Тестирование извлечения
     extract_dir = f"{EXTRACT_DIR}/extract_{test_case['name']}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    ssh_client.run_ssh_command(f"mkdir -p '{extract_dir}'")
-
-    start_time = time.time()
-    ssh_client.run_ssh_command(f"7z x '{archive_file}' -o'{extract_dir}' -y")
-    end_time = time.time()
-
-    # Получаем данные о CPU для распаковки
-    max_cpu_extract = 'N/A'
-    if cpu_monitoring and cpu_log_extract:
-        max_cpu_extract = parse_max_cpu(ssh_client, cpu_log_extract)
-
-    duration = end_time - start_time
-    speed = test_case['total_size'] / duration if duration > 0 else 0
-
-    with open("performance_results.csv", "a", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            test_case['name'],
-            "Extract",
-            test_case['total_size'],
-            test_case['file_count'],
-            datetime.fromtimestamp(start_time).isoformat(),
-            datetime.fromtimestamp(end_time).isoformat(),
-            f"{duration:.2f}",
-            f"{speed:.2f}",
-            max_cpu_extract
-        ])
-
-    # Очистка
-    ssh_client.run_ssh_command(f"rm -f '{archive_file}'", check=False)
-    ssh_client.run_ssh_command(f"rm -rf '{extract_dir}'", check=False)
+    file_list = " ".join([f"'{f}'" for f in files])
 
+    # Время измеряет агент на сервере, без задержек SSH-канала.
+    # Подготовка к прогону выполняется отдельной командой вне замера.
+    limits = case_limits(test_case)
+
+    def archive_trial():
+        ssh_client.run_ssh_command(f"rm -f '{archive_file}'")
+        return bench_agent.run(f"7z a -t7z '{archive_file}' {file_list}", limits=limits)
+
+    def extract_trial():
+        ssh_client.run_ssh_command(f"rm -rf '{extract_dir}' && mkdir -p '{extract_dir}'")
+        return bench_agent.run(f"7z x '{archive_file}' -o'{extract_dir}' -y", limits=limits)
+
+    warmup = TRIALS.get('warmup', 1)
+    repeat = TRIALS.get('repeat', 5)
+
+    compression_ratio = None
+
+    for operation, trial in (("Archive", archive_trial), ("Extract", extract_trial)):
+        records = run_trials(trial, warmup, repeat)
+        if compression_ratio is None:
+            # Размеры архива и исходных файлов одной командой: доля от исходных данных
+            sizes = [int(size) for size in
+                     ssh_client.run_ssh_command(f"stat -c %s '{archive_file}' {file_list}").split()]
+            compression_ratio = round(sizes[0] / sum(sizes[1:]), 4) if sum(sizes[1:]) else 1.0
+            print(f"\n{test_case['name']}: данные {profile}, архив {compression_ratio:.1%} от исходного размера")
+        for number, record in enumerate(records, 1):
+            # Загрузку CPU агент снимает по /proc/stat только на время операции
+            cpu = save_cpu_log(test_case['name'], operation, record)
+            write_result_row(results_store, test_case, operation, record, cpu, number,
+                             compression_ratio=compression_ratio)
+
+        summary = summarize([record['wall_s'] for record in records],
+                            TRIALS.get('confidence', 0.95), TRIALS.get('outliers', 'iqr'))
+        print(f"\n{test_case['name']} {operation}: медиана {summary['median']:.3f} сек, "
+              f"p95 {summary['p95']:.3f} сек, CI [{summary['ci_low']:.3f}; {summary['ci_high']:.3f}]")
 
-@pytest.fixture(scope="session", autouse=True)
-def final_report():
-    """Фикстура для генерации финального отчета"""
+    # Очистка
+    remote_executor.run_all([f"rm -f '{archive_file}'", f"rm -rf '{extract_dir}'"], check=False)
+
+
+# Параметры прогона с N одновременными заданиями
+LOAD = config['performance'].get('load', {})
+
+
+def run_load_test(test_case, make_files, ssh_client, remote_executor, bench_agent, store):
+    """
+    Одновременные задания архивации, затем распаковки, каждое над своим корпусом и в своем SSH-канале
+    :return: {операция: точки contention_curve}
+    """
+    name = test_case['name']
+    levels = sorted({1, *LOAD.get('jobs', [1, 2, 4])})
+    rounds = LOAD.get('rounds', 3)
+    limits = case_limits(test_case)
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+
+    # Отдельные корпуса: задания не делят входные файлы в кеше страниц
+    corpora = [make_files(test_case['file_sizes'], prefix=f"{name}_job{job}", profile=test_case.get('profile', 'random'))
+               for job in range(levels[-1])]
+    archives = [f"{PERF_ARCHIVE_DIR}/load_{name}_{stamp}_{job}.7z" for job in range(levels[-1])]
+    extract_dirs = [f"{EXTRACT_DIR}/load_{name}_{stamp}_{job}" for job in range(levels[-1])]
+
+    def archive_command(job):
+        file_list = " ".join(f"'{f}'" for f in corpora[job])
+        return f"7z a -t7z '{archives[job]}' {file_list}"
+
+    def extract_command(job):
+        return f"7z x '{archives[job]}' -o'{extract_dirs[job]}' -y"
+
+    def prepare_archive(jobs):
+        return [f"rm -f '{archives[job]}'" for job in range(jobs)]
+
+    def prepare_extract(jobs):
+        return [f"rm -rf '{extract_dirs[job]}' && mkdir -p '{extract_dirs[job]}'" for job in range(jobs)]
+
+    curves = {}
+    # Распаковка идет после архивации: к ней готовы архивы всех заданий
+    for operation, command, prepare in (("Archive", archive_command, prepare_archive),
+                                        ("Extract", extract_command, prepare_extract)):
+        for _ in range(TRIALS.get('warmup', 1)):
+            ssh_client.run_batch(prepare(1))
+            bench_agent.run(command(0), limits=limits)
+        measured = {}
+        for jobs in levels:
+            level = measured[jobs] = {'latencies': [], 'mbps': [], 'runs': []}
+            for _ in range(rounds):
+                ssh_client.run_batch(prepare(jobs))
+                commands = [command(job) for job in range(jobs)]
+                outputs = remote_executor.run_all([bench_agent.command(c, limits) for c in commands])
+                runs = [bench_agent.parse(output, c) for output, c in zip(outputs, commands)]
+                # Окно нагрузки по часам сервера: от первого старта до последнего завершения
+                wall = max(record['end_time'] for record in runs) - min(record['start_time'] for record in runs)
+                level['latencies'] += [record['wall_s'] for record in runs]
+                level['mbps'].append(test_case['total_size'] * jobs / wall)
+                level['runs'] += runs
+
+        curve = contention_curve(measured)
+        for point in curve:
+            for number, record in enumerate(measured[point['jobs']]['runs'], 1):
+                write_result_row(store, test_case, f"{operation} x{point['jobs']}", record, record['cpu'], number,
+                                 jobs=point['jobs'], aggregate_mbps=round(point['aggregate_mbps'], 2),
+                                 slowdown=round(point['slowdown'], 3))
+        curves[operation] = curve
+
+    remote_executor.run_all([f"rm -f '{archive}'" for archive in archives] +
+                            [f"rm -rf '{extract_dir}'" for extract_dir in extract_dirs], check=False)
+    return curves
+
+
+def print_contention_curve(title, curve):
+    print(f"\n{title}:")
+    print(f"{'Заданий':>7} | {'MB/s всего':>10} | {'p50, с':>8} | {'p95, с':>8} | {'max, с':>8} | {'Замедление':>10}")
+    for point in curve:
+        print(f"{point['jobs']:>7} | {point['aggregate_mbps']:>10.2f} | {point['p50']:>8.3f} | "
+              f"{point['p95']:>8.3f} | {point['max']:>8.3f} | {point['slowdown']:>9.2f}x")
+
+
+load_cases = [tc for tc in test_cases if not LOAD.get('cases') or tc['name'] in LOAD['cases']]
+
+
+@pytest.mark.skipif(not LOAD.get('enabled', False), reason="load выключен в config.yaml")
+@pytest.mark.parametrize("test_case", load_cases, ids=lambda tc: tc['name'])
+def test_concurrent_load(make_files, test_case, ssh_client, remote_executor, bench_agent, results_store):
+    """Суммарная пропускная способность и задержки при росте числа одновременных заданий на сервере"""
+    if max(LOAD.get('jobs', [1, 2, 4])) > remote_executor.max_concurrency:
+        pytest.skip("Заданий больше, чем параллельных каналов (async.max_concurrency)")
+    curves = run_load_test(test_case, make_files, ssh_client, remote_executor, bench_agent, results_store)
+    for operation, curve in curves.items():
+        print_contention_curve(f"{test_case['name']}, {operation}: одновременные задания", curve)
+
+
+@pytest.fixture(scope="session")
+def final_report(results_store):
+    """Фикстура для генерации финального отчета по накопленной статистике"""
     yield
 
-    # Чтение результатов
-    try:
-        import pandas as pd
-        df = pd.read_csv("performance_results.csv")
-
-        print("\n\nСравнительная таблица производительности:")
-        print("-----------------------------------------------------------------------------------------")
-        print("Тест                 | Операция   | Размер (MB) | Время (сек)  | Скорость (MB/s) | Max CPU (%)")
-        print("-----------------------------------------------------------------------------------------")
-
-        for _, row in df.iterrows():
-            print(
-                f"{row['Test Case'][:20]:<20} | {row['Operation']:<10} | {row['Total Size (MB)']:>11} | {row['Duration (s)']:>12} | {row['Speed (MB/s)']:>14} | {row['Max CPU (%)']:>11}")
-
-        print("\nСводка по тест-кейсам:")
-        print("-----------------------------------------------------------------------------------------")
-        grouped = df.groupby(['Test Case', 'Operation']).agg({
-            'Total Size (MB)': 'first',
-            'Duration (s)': 'mean',
-            'Speed (MB/s)': 'mean',
-            'Max CPU (%)': 'max'
-        })
-        print(grouped)
-
-    except ImportError:
-        print("Для генерации отчета установите pandas: pip install pandas")
-    except Exception as e:
-        print(f"Ошибка при генерации отчета: {str(e)}")
\ No newline at end of file
+    # Статистика копится при каждой записи результата, здесь только вывод
+    table = results_store.aggregator.table()
+    if not table:
+        return
+
+    print("\n\nСводка по тест-кейсам:")
+    print("-" * 127)
+    print(f"{'Тест':<20} | {'Операция':<10} | {'n':>5} | {'Время ср.':>9} | {'p50':>8} | {'p95':>8} | "
+          f"{'СКО':>8} | {'MB/s ср.':>9} | {'MB/s мин':>9} | {'Max CPU':>8} | {'RSS MB':>7} | {'Сжатие':>6}")
+    print("-" * 127)
+    for (test_case, operation), metrics in table.items():
+        duration = metrics['duration_s']
+        speed = metrics['speed_mbps']
+        cpu = metrics['max_cpu']
+        rss = metrics['max_rss_mb']
+        # Строки нагрузочного теста степень сжатия не записывают
+        ratio = metrics['compression_ratio']
+        ratio_text = f"{ratio['mean']:.1%}" if ratio['count'] else "-"
+        print(f"{test_case[:20]:<20} | {operation:<10} | {duration['count']:>5} | {duration['mean']:>9.3f} | "
+              f"{duration['p50']:>8.3f} | {duration['p95']:>8.3f} | {duration['stdev']:>8.3f} | "
+              f"{speed['mean']:>9.2f} | {speed['min']:>9.2f} | {cpu['max']:>8.1f} | {rss['max']:>7.1f} | "
+              f"{ratio_text:>6}")